@@ -1,16 +1,19 @@
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
 from config import Config
+from app.database import RoutingSQLAlchemy
 
 app = Flask(__name__)
 app.config.from_object(Config)
-db = SQLAlchemy(app)
+db = RoutingSQLAlchemy(app)
 migrate = Migrate(app, db)
 login = LoginManager(app)
 login.login_view = 'login'
 login.login_message_category = 'danger'
 login.login_message = 'Authorization required to access this page'
 
-from app import models, errors, routes, api_routes
+from app import (
+    models, search, analytics, metrics, profiler, errors, jobs, routes,
+    api_routes, cli
+)
@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+from math import ceil, floor
+from app import app, db
+from app.cache import create_cache
+from app.models import STATUSES, Task, TaskEvent, users_tasks
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PERCENTILES = (50, 75, 90, 95)
+
+analytics_cache = create_cache(app.config, 'analytics')
+
+
+def data_version():
+    return '.'.join(str(value) for value in db.session.execute(db.select([
+        db.select([db.func.count(Task.id)]).as_scalar(),
+        db.select([db.func.max(Task.id)]).as_scalar(),
+        db.select([db.func.sum(Task.version)]).as_scalar(),
+        db.select([db.func.max(TaskEvent.id)]).as_scalar(),
+        db.select([db.func.count()]).select_from(users_tasks).as_scalar(),
+    ])).first())
+
+
+def fetch_columns():
+    tasks = db.session.execute(db.select([
+        Task.id, Task.status, Task.started, Task.finished, Task.active_time
+    ]).order_by(Task.id)).fetchall()
+    performers = db.session.execute(
+        db.select([users_tasks.c.task_id])).fetchall()
+    return (
+        [list(column) for column in zip(*tasks)] or [[]] * 5,
+        [task_id for task_id, in performers],
+    )
+
+
+def percentile(values, q):
+    k = (len(values) - 1) * q / 100
+    low, high = values[floor(k)], values[ceil(k)]
+    return low + (high - low) * (k - floor(k))
+
+
+def compute_numpy(tasks, performers, now, weeks):
+    ids, status, started, finished, active_time = tasks
+    ids = np.array(ids, dtype=np.int64)
+    status = np.array(status, dtype=np.int64)
+    started = np.array(started, dtype='datetime64[us]')
+    finished = np.array(finished, dtype='datetime64[us]')
+    active_time = np.array(active_time, dtype=np.float64)
+
+    done = (status == 3) & ~np.isnat(finished)
+    cycle_time = (finished[done] - started[done]) / np.timedelta64(1, 's')
+    active_time = np.nan_to_num(active_time[done])
+    age = ((np.datetime64(now, 'us') - finished[done]) //
+           np.timedelta64(7, 'D'))
+    age = age[(age >= 0) & (age < weeks)].astype(np.int64)
+    assigned = status[np.searchsorted(
+        ids, np.array(performers, dtype=np.int64))]
+    return {
+        'wip': np.bincount(status, minlength=len(STATUSES)).tolist(),
+        'assigned': np.bincount(assigned, minlength=len(STATUSES)).tolist(),
+        'cycle_time': (np.percentile(cycle_time, PERCENTILES).tolist()
+                       if cycle_time.size else []),
+        'active_time': (np.percentile(active_time, PERCENTILES).tolist()
+                        if active_time.size else []),
+        'throughput': np.bincount(age, minlength=weeks).tolist(),
+    }
+
+
+def compute_python(tasks, performers, now, weeks):
+    ids, status, started, finished, active_time = tasks
+    wip, assigned, throughput = ([0] * len(STATUSES), [0] * len(STATUSES),
+                                 [0] * weeks)
+    cycle_time, done_active_time = [], []
+    for value, started_, finished_, active in zip(
+            status, started, finished, active_time):
+        wip[value] += 1
+        if value == 3 and finished_ is not None:
+            cycle_time.append((finished_ - started_).total_seconds())
+            done_active_time.append(active or 0)
+            age = (now - finished_) // timedelta(days=7)
+            if 0 <= age < weeks:
+                throughput[age] += 1
+    statuses = dict(zip(ids, status))
+    for task_id in performers:
+        assigned[statuses[task_id]] += 1
+    cycle_time.sort()
+    done_active_time.sort()
+    return {
+        'wip': wip,
+        'assigned': assigned,
+        'cycle_time': [percentile(cycle_time, q) for q in PERCENTILES
+                       ] if cycle_time else [],
+        'active_time': [percentile(done_active_time, q) for q in PERCENTILES
+                        ] if done_active_time else [],
+        'throughput': throughput,
+    }
+
+
+def board_analytics():
+    version = data_version()
+    result = analytics_cache.get(version)
+    if result is not None:
+        return result
+
+    now = datetime.utcnow()
+    weeks = app.config['ANALYTICS_WEEKS']
+    tasks, performers = fetch_columns()
+    compute = compute_python if np is None else compute_numpy
+    metrics = compute(tasks, performers, now, weeks)
+    result = {
+        'version': version,
+        'tasks': len(tasks[0]),
+        'wip': dict(zip(STATUSES, metrics['wip'])),
+        'assigned': dict(zip(STATUSES, metrics['assigned'])),
+        'cycle_time': {f'p{q}': value for q, value in zip(
+            PERCENTILES, metrics['cycle_time'])},
+        'active_time': {f'p{q}': value for q, value in zip(
+            PERCENTILES, metrics['active_time'])},
+        'throughput': [
+            {'week': f'{now - timedelta(weeks=age + 1):%Y-%m-%d}',
+             'done': done}
+            for age, done in reversed(list(enumerate(metrics['throughput'])))
+        ],
+    }
+    analytics_cache.set(version, result)
+    return result
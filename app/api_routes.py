@@ -1,22 +1,88 @@
-from functools import wraps
-from flask import request, jsonify
-from app import app
-from app.models import User, Task
+from functools import partial, wraps
+from inspect import isgeneratorfunction
+from flask import request, jsonify, g, Response, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
+from app import app, db
+from app.models import (
+    User, Task, TaskEvent, Job, chunked, parse_datetime, query_in,
+    users_tasks, PERFORMER_KEYS
+)
+from app.analytics import board_analytics
+from app.conditional import make_etag, is_fresh, with_etag, not_modified
 from app.errors import bad_request
+from app.events import user_channels, event_stream
+from app.jobs import handlers, submit
+from app.negotiation import (
+    JSON, dumps, load_body, negotiate, representation, make_api_response
+)
+from app.search import search_tasks
 
 
-def jsonify_(func):
+NDJSON = 'application/x-ndjson'
+
+
+def ndjson(response):
+    try:
+        for item in response:
+            yield dumps(item) + b'\n'
+    except Exception as e:
+        db.session.rollback()
+        yield dumps({'error': 'Bad Request', 'message': str(e)}) + b'\n'
+
+
+def jsonify_(func=None, etag=None):
+    if func is None:
+        return partial(jsonify_, etag=etag)
+    if isgeneratorfunction(func):
+        handlers[func.__name__] = func
+
     @wraps(func)
     def func_new(*args, **kwargs):
+        g.api_user = None
+        auth = request.headers.get('Authorization', '')
+        if auth.startswith('Bearer '):
+            g.api_user = User.verify_token(auth[len('Bearer '):])
+            if g.api_user is None:
+                return bad_request('Invalid or expired token', 401)
         try:
-            data = request.get_json() or {}
-            return jsonify(func(data, *args, **kwargs))
+            data = load_body() or {}
+            mimetype, encoding = negotiate()
+            if (request.args.get('async') and isinstance(data, list) and
+                    func.__name__ in handlers):
+                job_ = submit(func.__name__, data,
+                              g.api_user and g.api_user.id)
+                return make_api_response(
+                    job_.get_json(0, 0), mimetype, encoding, 202)
+            tag = etag and etag(data)
+            if tag:
+                tag += representation(mimetype, encoding)
+                if is_fresh(tag):
+                    return not_modified(tag)
+            response = func(data, *args, **kwargs)
+            if isinstance(response, dict):
+                response = make_api_response(response, mimetype, encoding)
+            elif request.accept_mimetypes.best_match(
+                    (JSON, NDJSON)) == NDJSON:
+                response = Response(
+                    stream_with_context(ndjson(response)), mimetype=NDJSON
+                )
+            else:
+                response = make_api_response(
+                    list(response), mimetype, encoding)
+            return with_etag(response, tag) if tag else response
+        except RequestEntityTooLarge as e:
+            return bad_request(e.description, e.code)
         except Exception as e:
             return bad_request(str(e))
 
     return func_new
 
 
+def page_size(data, default):
+    return max(min(int(data.get('limit') or default),
+                   app.config['API_MAX_PAGE_SIZE']), 1)
+
+
 def check_fields(source, field_names):
     if any(field_name not in source for field_name in field_names):
         return {
@@ -33,9 +99,25 @@ def check_fields(source, field_names):
         }
 
 
-def check_user_exist(source):
-    user = (User.query.filter_by(login=source.get('login', '')).first() or
-            User.query.filter_by(email=source.get('email', '')).first())
+def bulk_response(data, field_names, create):
+    errors = [check_fields(source, field_names) for source in data]
+    results = iter(create([
+        source for source, error_msg in zip(data, errors) if error_msg is None
+    ]))
+    response = []
+    for source, error_msg in zip(data, errors):
+        if error_msg is None:
+            result, message = next(results)
+            error_msg = {
+                'result': result,
+                'message': message,
+                'data': source,
+            }
+        response.append(error_msg)
+    return response
+
+
+def check_user_access(source, user, api_user=None):
     if user is None:
         return False, {
             'result': False,
@@ -43,7 +125,14 @@ def check_user_exist(source):
             'data': source,
         }
 
-    if not user.check_password(source.get('password', '')):
+    if api_user is not None:
+        if api_user.type != 1 and api_user.id != user.id:
+            return False, {
+                'result': False,
+                'message': 'Access denied',
+                'data': source,
+            }
+    elif not user.check_password(source.get('password', '')):
         return False, {
             'result': False,
             'message': 'Wrong password',
@@ -52,6 +141,30 @@ def check_user_exist(source):
     return True, user
 
 
+def check_user_exist(source, api_user=None):
+    user = (User.query.filter_by(login=source.get('login', '')).first() or
+            User.query.filter_by(email=source.get('email', '')).first())
+    return check_user_access(source, user, api_user)
+
+
+def check_users_exist(data, api_user=None):
+    by_login, by_email = {}, {}
+    for chunk in chunked(data, app.config['SQL_IN_CHUNK_SIZE']):
+        for user in User.query.filter(db.or_(
+                User.login.in_({source.get('login', '') for source in chunk}),
+                User.email.in_({source.get('email', '') for source in chunk}),
+        )):
+            by_login[user.login] = user
+            by_email[user.email] = user
+
+    return [check_user_access(
+        source,
+        by_login.get(source.get('login', '')) or
+        by_email.get(source.get('email', '')),
+        api_user
+    ) for source in data]
+
+
 def check_task_exist(source):
     task = Task.query.filter_by(title=source.get('title', '')).first()
     if task is None:
@@ -63,134 +176,351 @@ def check_task_exist(source):
     return True, task
 
 
+def check_tasks_exist(data):
+    tasks = {task.title: task for task in query_in(
+        Task.query_eager(), Task.title,
+        (source.get('title', '') for source in data)
+    )}
+    response = []
+    for source in data:
+        task = tasks.get(source.get('title', ''))
+        if task is None:
+            response.append((False, {
+                'result': False,
+                'message': 'Task no exist',
+                'data': source,
+            }))
+        else:
+            response.append((True, task))
+    return response
+
+
+def users_etag(data):
+    if g.api_user is None:
+        return None
+    logins = {source.get('login', '') for source in data}
+    emails = {source.get('email', '') for source in data}
+    rows = set()
+    for chunk in chunked(logins | emails, app.config['SQL_IN_CHUNK_SIZE']):
+        rows.update(db.session.query(User.id, User.version).filter(db.or_(
+            User.login.in_(chunk), User.email.in_(chunk))))
+    return make_etag(
+        [{key: value for key, value in source.items() if key != 'password'}
+         for source in data],
+        g.api_user.id, g.api_user.version, sorted(rows)
+    )
+
+
+def tasks_etag(data):
+    titles = [source.get('title', '') for source in data]
+    return make_etag(titles, sorted(query_in(
+        db.session.query(Task.title, Task.id, Task.version),
+        Task.title, titles)))
+
+
 @app.route('/api')
 def api():
     return jsonify({
-        'api_function': ('get_users', 'add_users', 'edit_users',
-                         'get_tasks', 'add_tasks', 'edit_tasks')
+        'api_function': ('token', 'get_users', 'add_users', 'edit_users',
+                         'get_tasks', 'add_tasks', 'edit_tasks', 'list_tasks',
+                         'reassign_tasks', 'search_tasks', 'time_report',
+                         'analytics', 'job', 'events')
     })
 
 
-@app.route('/api/add_users', methods=('POST',))
+@app.route('/api/token', methods=('POST',))
 @jsonify_
-def add_users(data):
-    response = []
-    for user_data in data:
-        error_msg = check_fields(
-            user_data,
-            ('login', 'email', 'first_name', 'last_name', 'type', 'password')
-        )
-        if error_msg is not None:
-            response.append(error_msg)
-            continue  # Waiting for Python 3.8 and PEP 572
+def token(data):
+    is_exist, user_or_msg = check_user_exist(data)
+    if not is_exist:
+        return user_or_msg
+    return {
+        'result': True,
+        'message': 'Success',
+        'data': {
+            'token': user_or_msg.get_token(),
+            'expires_in': app.config['API_TOKEN_EXPIRES_IN'],
+        },
+    }
 
-        is_exist, user_or_msg = check_user_exist(user_data)
-        if is_exist:
-            response.append({
-                'result': False,
-                'message': 'User exist',
-                'data': user_data,
-
-            })
-            continue
 
-        User.create(source=user_data)
-        response.append({
-            'result': True,
-            'message': 'User successfully added',
-            'data': user_data,
-        })
-    return response
+@app.route('/api/add_users', methods=('POST',))
+@jsonify_
+def add_users(data):
+    yield from bulk_response(
+        data,
+        ('login', 'email', 'first_name', 'last_name', 'type', 'password'),
+        User.bulk_create
+    )
 
 
 @app.route('/api/get_users', methods=('POST',))
-@jsonify_
+@jsonify_(etag=users_etag)
 def get_users(data):
-    response = []
-    for user_data in data:
-        is_exist, user_or_msg = check_user_exist(user_data)
-        if is_exist:
-            response.append(user_or_msg.get_json())
-        else:
-            response.append(user_or_msg)
-    return response
+    for chunk in chunked(data, app.config['BULK_CHUNK_SIZE']):
+        checked = check_users_exist(chunk, g.api_user)
+        assign_tasks, tasks = User.tasks_titles(
+            [user_or_msg for is_exist, user_or_msg in checked if is_exist]
+        )
+        for is_exist, user_or_msg in checked:
+            if is_exist:
+                yield user_or_msg.get_json(
+                    assign_tasks[user_or_msg.id], tasks[user_or_msg.id]
+                )
+            else:
+                yield user_or_msg
+        db.session.expunge_all()
 
 
 @app.route('/api/edit_users', methods=('POST',))
 @jsonify_
 def edit_users(data):
-    response = []
     for user_data in data:
-        is_exist, user_or_msg = check_user_exist(user_data)
-        if is_exist:
+        is_exist, user_or_msg = check_user_exist(user_data, g.api_user)
+        if is_exist and user_data.get('delete') and user_data.get(
+                'background'):
+            job_ = submit('purge_users', [user_or_msg.id],
+                          g.api_user and g.api_user.id)
+            yield {
+                'result': is_exist,
+                'message': 'User successfully edited',
+                'data': user_data,
+                'job': job_.id,
+            }
+        elif is_exist:
             User.edit(user_or_msg, user_data)
-            response.append({
+            yield {
                 'result': is_exist,
                 'message': 'User successfully edited',
                 'data': user_data,
-            })
+            }
         else:
-            response.append(user_or_msg)
-    return response
+            yield user_or_msg
 
 
 @app.route('/api/add_tasks', methods=('POST',))
 @jsonify_
 def add_tasks(data):
-    response = []
-    for task_data in data:
-        error_msg = check_fields(
-            task_data, ('title', 'description', 'author', 'users')
+    for chunk in chunked(data, app.config['BULK_CHUNK_SIZE']):
+        yield from bulk_response(
+            chunk, ('title', 'description', 'author', 'users'),
+            Task.bulk_create
         )
-        if error_msg is not None:
-            response.append(error_msg)
-            continue
-
-        is_exist, task_or_msg = check_task_exist(task_data)
-        if is_exist:
-            response.append({
-                'result': False,
-                'message': 'Task exist',
-                'data': task_data
-            })
-            continue
-
-        Task.create(source=task_data)
-        response.append({
-            'result': True,
-            'message': 'Task successfully added',
-            'data': task_data,
-        })
-
-    return response
 
 
 @app.route('/api/get_tasks', methods=('POST',))
-@jsonify_
+@jsonify_(etag=tasks_etag)
 def get_tasks(data):
-    response = []
-    for task_data in data:
-        is_exist, task_or_msg = check_task_exist(task_data)
-        if is_exist:
-            response.append(task_or_msg.get_json())
-        else:
-            response.append(task_or_msg)
-    return response
+    for chunk in chunked(data, app.config['BULK_CHUNK_SIZE']):
+        for is_exist, task_or_msg in check_tasks_exist(chunk):
+            if is_exist:
+                yield task_or_msg.get_json()
+            else:
+                yield task_or_msg
+        db.session.expunge_all()
 
 
 @app.route('/api/edit_tasks', methods=('POST',))
 @jsonify_
 def edit_tasks(data):
-    response = []
     for task_data in data:
         is_exist, task_or_msg = check_task_exist(task_data)
-        if is_exist:
-            Task.edit(task_or_msg, task_data)
-            response.append({
-                'result': is_exist,
+        if not is_exist:
+            yield task_or_msg
+        elif Task.edit(task_or_msg, task_data):
+            yield {
+                'result': True,
                 'message': 'Task successfully edited',
                 'data': task_data,
-            })
+            }
         else:
-            response.append(task_or_msg)
+            yield {
+                'result': False,
+                'message': 'User no exist',
+                'data': task_data,
+            }
+
+
+@app.route('/api/list_tasks', methods=('POST',))
+@jsonify_
+def list_tasks(data):
+    response = {
+        'result': True,
+        'message': 'Success',
+        'data': [],
+        'cursor': None,
+    }
+    logins = {data[key] for key in ('author', 'performer') if key in data}
+    users_id = {}
+    if logins:
+        users_id = dict(db.session.query(User.login, User.id).filter(
+            User.login.in_(logins)))
+        if len(users_id) < len(logins):
+            return response
+
+    query, keys = Task.query, None
+    if 'author' in data:
+        query = query.filter(Task.author_id == users_id[data['author']])
+    if 'performer' in data:
+        query = query.join(users_tasks).filter(
+            users_tasks.c.user_id == users_id[data['performer']])
+        keys = PERFORMER_KEYS
+    if 'status' in data:
+        status = data['status']
+        query = query.filter(Task.status_in(
+            status if isinstance(status, list) else [status]))
+    for key, column in (('started', Task.started),
+                        ('finished', Task.finished)):
+        if data.get(f'{key}_from'):
+            query = query.filter(column >= parse_datetime(data[f'{key}_from']))
+        if data.get(f'{key}_to'):
+            query = query.filter(column < parse_datetime(data[f'{key}_to']))
+
+    cursor = None
+    if data.get('cursor'):
+        try:
+            cursor = Task.parse_cursor(data['cursor'])
+        except ValueError:
+            raise ValueError('Invalid cursor')
+    limit = page_size(data, app.config['TASKS_PER_PAGE'])
+
+    tasks, response['cursor'] = Task.page(query, cursor, limit, keys)
+    response['data'] = [task.get_json()['data'] for task in tasks]
     return response
+
+
+@app.route('/api/reassign_tasks', methods=('POST',))
+@jsonify_
+def reassign_tasks(data):
+    checked = [
+        (False, {
+            'result': False,
+            'message': 'Few fields are not exist',
+            'data': source,
+        }) if is_exist and source.get('users') is None and
+        source.get('users_id') is None else (is_exist, task_or_msg)
+        for source, (is_exist, task_or_msg) in zip(
+            data, check_tasks_exist(data))
+    ]
+    tasks, sources = [], []
+    for source, (is_exist, task_or_msg) in zip(data, checked):
+        if is_exist:
+            tasks.append(task_or_msg)
+            sources.append(source)
+    results = iter(Task.bulk_set_users(tasks, sources))
+    db.session.commit()
+
+    for source, (is_exist, task_or_msg) in zip(data, checked):
+        if not is_exist:
+            yield task_or_msg
+        elif next(results):
+            yield {
+                'result': True,
+                'message': 'Performers successfully reassigned',
+                'data': source,
+            }
+        else:
+            yield {
+                'result': False,
+                'message': 'User no exist',
+                'data': source,
+            }
+
+
+@app.route('/api/search_tasks', methods=('POST',))
+@jsonify_
+def search_tasks_(data):
+    page = max(int(data.get('page') or 1), 1)
+    limit = page_size(data, app.config['SEARCH_PER_PAGE'])
+    found, total = search_tasks(data.get('query', ''), page, limit)
+    response = []
+    for task, snippet, rank in found:
+        task_data = task.get_json()['data']
+        task_data.update(snippet=snippet, rank=rank)
+        response.append(task_data)
+    return {
+        'result': True,
+        'message': 'Success',
+        'data': response,
+        'page': page,
+        'total': total,
+    }
+
+
+@app.route('/api/time_report', methods=('POST',))
+@jsonify_
+def time_report(data):
+    users_id = None
+    if data.get('users') is not None:
+        users_id = dict(query_in(
+            db.session.query(User.id, User.login), User.login, data['users']))
+    since = data.get('from') and parse_datetime(data['from'])
+    until = data.get('to') and parse_datetime(data['to'])
+    totals = TaskEvent.rollup(
+        data.get('role', 'to'), data.get('period', 'day'), since, until,
+        users_id and list(users_id),
+    )
+    logins = users_id or dict(query_in(
+        db.session.query(User.id, User.login), User.id,
+        {user_id for user_id, period in totals}))
+    return {
+        'result': True,
+        'message': 'Success',
+        'data': [
+            {'user': logins[user_id], 'period': period, 'seconds': seconds}
+            for (user_id, period), seconds in sorted(
+                totals.items(), key=lambda item: (item[0][1], item[0][0]))
+            if user_id in logins
+        ],
+    }
+
+
+@app.route('/api/analytics', methods=('POST',))
+@jsonify_
+def analytics(data):
+    user = g.api_user
+    if user is None:
+        is_exist, user = check_user_exist(data)
+        if not is_exist:
+            return user
+    if user.type != 1:
+        return {
+            'result': False,
+            'message': 'Access denied',
+            'data': data,
+        }
+    return {
+        'result': True,
+        'message': 'Success',
+        'data': board_analytics(),
+    }
+
+
+@app.route('/api/job', methods=('POST',))
+@jsonify_
+def job(data):
+    job_ = Job.query.get(data.get('job', ''))
+    if job_ is None or job_.user_id is not None and (
+            g.api_user is None or
+            g.api_user.type != 1 and g.api_user.id != job_.user_id):
+        return {
+            'result': False,
+            'message': 'Job no exist',
+            'data': data,
+        }
+    return job_.get_json(
+        max(int(data.get('offset') or 0), 0),
+        page_size(data, app.config['API_MAX_PAGE_SIZE'])
+    )
+
+
+@app.route('/api/events')
+def events_():
+    if not app.config['EVENTS_ENABLED']:
+        return bad_request('Live updates are disabled', 404)
+    auth = request.headers.get('Authorization', '')
+    user = (User.verify_token(auth[len('Bearer '):])
+            if auth.startswith('Bearer ') else None)
+    if user is None:
+        return bad_request('Invalid or expired token', 401)
+    return event_stream(user_channels(user, bool(request.args.get('board'))))
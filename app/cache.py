@@ -0,0 +1,90 @@
+import json
+import sqlite3
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic, time
+
+
+class LocalCache:
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.items = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = value, monotonic() + self.ttl
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+class SQLiteCache:
+    def __init__(self, path, ttl, namespace):
+        self.path = path
+        self.ttl = ttl
+        self.namespace = namespace
+        self.execute(
+            'CREATE TABLE IF NOT EXISTS cache '
+            '(key TEXT PRIMARY KEY, value TEXT, expires REAL)'
+        )
+
+    def execute(self, sql, parameters=()):
+        connection = sqlite3.connect(self.path, timeout=5)
+        try:
+            with connection:
+                return connection.execute(sql, parameters).fetchone()
+        finally:
+            connection.close()
+
+    def get(self, key):
+        row = self.execute(
+            'SELECT value FROM cache WHERE key = ? AND expires >= ?',
+            (f'{self.namespace}:{key}', time())
+        )
+        return None if row is None else json.loads(row[0])
+
+    def set(self, key, value):
+        self.execute(
+            'REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+            (f'{self.namespace}:{key}', json.dumps(value), time() + self.ttl)
+        )
+
+    def delete(self, key):
+        self.execute('DELETE FROM cache WHERE key = ?',
+                     (f'{self.namespace}:{key}',))
+
+    def clear(self):
+        self.execute('DELETE FROM cache WHERE key LIKE ?',
+                     (f'{self.namespace}:%',))
+
+
+def create_cache(config, namespace):
+    url = config['CACHE_URL']
+    ttl = config[f'{namespace.upper()}_CACHE_TTL']
+    if url:
+        if not url.startswith('sqlite:///'):
+            raise ValueError(f'Unsupported cache backend {url}')
+        return SQLiteCache(url[len('sqlite:///'):], ttl, namespace)
+    return LocalCache(config[f'{namespace.upper()}_CACHE_SIZE'], ttl)
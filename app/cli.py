@@ -0,0 +1,237 @@
+import os
+import pstats
+import re
+from collections import defaultdict
+from datetime import datetime
+import click
+from flask import json
+from flask.cli import AppGroup
+from app import app, db
+from app.models import (
+    User, Task, chunked, parse_datetime, users_tasks, PERFORMER_KEYS
+)
+
+data_cli = AppGroup('data', help='Bulk import and export in JSONL format.')
+
+USER_FIELDS = ('login', 'email', 'first_name', 'last_name', 'type')
+TASK_FIELDS = ('title', 'description', 'author', 'users')
+PAGED_QUERIES = {
+    'tasks board', 'assigned tasks board', 'tasks by performer and status',
+    'tasks by status',
+}
+
+
+def read_jsonl(file, offset):
+    for line_number, line in enumerate(file, 1):
+        if line_number <= offset or not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            raise click.ClickException(f'Line {line_number}: {e}')
+
+
+def import_jsonl(file, offset, chunk_size, prepare, create):
+    added = skipped = 0
+    lines = read_jsonl(file, offset)
+    for chunk in chunked(lines, chunk_size or app.config['BULK_CHUNK_SIZE']):
+        sources = []
+        for line_number, source in chunk:
+            source = prepare(source)
+            if source is not None:
+                sources.append(source)
+            else:
+                skipped += 1
+                click.echo(f'Line {line_number}: few fields are not exist',
+                           err=True)
+        results = create(sources, restore=True)
+        added += sum(result for result, message in results)
+        skipped += len(results) - sum(result for result, message in results)
+        offset = chunk[-1][0]
+        click.echo(f'Committed up to line {offset}: '
+                   f'{added} added, {skipped} skipped', err=True)
+    click.echo(f'Done at offset {offset}', err=True)
+
+
+def prepare_user(source):
+    if any(field_name not in source for field_name in USER_FIELDS):
+        return None
+    if 'password' not in source and 'password_hash' not in source:
+        return None
+    return source
+
+
+def prepare_task(source):
+    if any(field_name not in source for field_name in TASK_FIELDS):
+        return None
+    for key in ('started', 'finished'):
+        if source.get(key):
+            source[key] = parse_datetime(source[key])
+    return source
+
+
+@data_cli.command('import-users')
+@click.argument('file', type=click.File())
+@click.option('--offset', default=0, help='Number of lines to skip.')
+@click.option('--chunk-size', default=0, help='Lines per commit.')
+def import_users(file, offset, chunk_size):
+    """Import users from FILE, one JSON object per line."""
+    import_jsonl(file, offset, chunk_size, prepare_user, User.bulk_create)
+
+
+@data_cli.command('import-tasks')
+@click.argument('file', type=click.File())
+@click.option('--offset', default=0, help='Number of lines to skip.')
+@click.option('--chunk-size', default=0, help='Lines per commit.')
+def import_tasks(file, offset, chunk_size):
+    """Import tasks from FILE, one JSON object per line."""
+    import_jsonl(file, offset, chunk_size, prepare_task, Task.bulk_create)
+
+
+@data_cli.command('export-users')
+@click.argument('file', type=click.File('a'), default='-')
+@click.option('--after-id', default=0, help='Resume after this user id.')
+@click.option('--chunk-size', default=0, help='Rows fetched per round trip.')
+def export_users(file, after_id, chunk_size):
+    """Export users to FILE, one JSON object per line."""
+    chunk_size = chunk_size or app.config['BULK_CHUNK_SIZE']
+    query = db.session.query(
+        User.id, User.login, User.email, User.first_name, User.last_name,
+        User.type, User.password_hash
+    ).filter(User.id > after_id).order_by(User.id).execution_options(
+        stream_results=True).yield_per(chunk_size)
+    for count, user in enumerate(query, 1):
+        file.write(json.dumps({
+            'login': user.login,
+            'email': user.email,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'type': user.type,
+            'password_hash': user.password_hash,
+        }) + '\n')
+        if count % chunk_size == 0:
+            click.echo(f'Exported up to user id {user.id}', err=True)
+    click.echo('Done', err=True)
+
+
+@data_cli.command('export-tasks')
+@click.argument('file', type=click.File('a'), default='-')
+@click.option('--after-id', default=0, help='Resume after this task id.')
+@click.option('--chunk-size', default=0, help='Rows fetched per round trip.')
+def export_tasks(file, after_id, chunk_size):
+    """Export tasks to FILE, one JSON object per line."""
+    chunk_size = chunk_size or app.config['BULK_CHUNK_SIZE']
+    while True:
+        tasks = Task.query_eager().filter(Task.id > after_id).order_by(
+            Task.id).limit(chunk_size).all()
+        if not tasks:
+            break
+        for task in tasks:
+            file.write(json.dumps({
+                'title': task.title,
+                'description': task.description,
+                'author': task.author.login,
+                'users': [user.login for user in task.users],
+                'status': task.status,
+                'started': task.started and task.started.isoformat(),
+                'finished': task.finished and task.finished.isoformat(),
+            }) + '\n')
+        after_id = tasks[-1].id
+        db.session.expunge_all()
+        click.echo(f'Exported up to task id {after_id}', err=True)
+    click.echo('Done', err=True)
+
+
+def hot_queries():
+    cursor = datetime.utcnow(), 1
+    quantity = db.func.count(Task.id.distinct())
+    return {
+        'tasks board': Task.page_query(
+            Task.query.join(users_tasks).filter(users_tasks.c.user_id == 1),
+            cursor, app.config['TASKS_PER_PAGE'], PERFORMER_KEYS
+        ),
+        'assigned tasks board': Task.page_query(
+            Task.query.filter_by(author_id=1),
+            cursor, app.config['TASKS_PER_PAGE']
+        ),
+        'tasks by performer and status': Task.page_query(
+            Task.query.join(users_tasks).filter(
+                users_tasks.c.user_id == 1, Task.status_in([0, 1])),
+            cursor, app.config['TASKS_PER_PAGE'], PERFORMER_KEYS
+        ),
+        'tasks by status': Task.page_query(
+            Task.query.filter(Task.status_in([0, 1])),
+            cursor, app.config['TASKS_PER_PAGE']
+        ),
+        'performers of tasks': db.session.query(users_tasks).filter(
+            users_tasks.c.task_id.in_([1, 2])),
+        'tasks of performers': db.session.query(users_tasks).filter(
+            users_tasks.c.user_id.in_([1, 2])),
+        'tasks quantity to': db.session.query(Task.status, quantity).join(
+            users_tasks).filter(users_tasks.c.user_id == 1
+                                ).group_by(Task.status),
+        'tasks quantity by': db.session.query(Task.status, quantity).filter(
+            Task.author_id == 1).group_by(Task.status),
+        'tasks by title': Task.query.filter(Task.title.in_(['A', 'B'])),
+        'users by login or email': User.query.filter(db.or_(
+            User.login.in_(['A', 'B']), User.email.in_(['A', 'B']))),
+    }
+
+
+def explain(query):
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    params = [str(compiled.params[name]) for name in compiled.positiontup]
+    connection = db.session.connection().connection
+    return [row[-1] for row in connection.execute(
+        f'EXPLAIN QUERY PLAN {compiled}', params
+    )]
+
+
+@app.cli.command('check-plans')
+@click.option('--output', type=click.File('w'),
+              help='Write the recorded plans as JSON.')
+def check_plans(output):
+    """Fail if a hot query scans a table or a page sorts its rows."""
+    if db.engine.name != 'sqlite':
+        raise click.ClickException('Only SQLite query plans are supported')
+    full_scan = re.compile(r'^SCAN (?:TABLE )?(\w+)\b')
+    plans, failed = {}, set()
+    for name, query in hot_queries().items():
+        plans[name] = explain(query)
+        click.echo(name)
+        for detail in plans[name]:
+            click.echo(f'    {detail}')
+            match = full_scan.match(detail)
+            if match and match.group(1) in db.metadata.tables:
+                failed.add(name)
+            if (name in PAGED_QUERIES and
+                    detail == 'USE TEMP B-TREE FOR ORDER BY'):
+                failed.add(name)
+    if output is not None:
+        json.dump(plans, output, indent=4)
+    if failed:
+        raise click.ClickException(
+            f'Full scan or sort in: {", ".join(sorted(failed))}')
+
+
+@app.cli.command('profile-report')
+@click.option('--directory', help='Defaults to PROFILE_DIR.')
+@click.option('--top', default=0, help='Functions per route.')
+@click.option('--sort', default='cumulative', help='pstats sort key.')
+def profile_report(directory, top, sort):
+    """Aggregate saved request profiles by route."""
+    directory = directory or app.config['PROFILE_DIR']
+    if not os.path.isdir(directory):
+        raise click.ClickException(f'No profiles in {directory}')
+    routes = defaultdict(list)
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.prof'):
+            routes[name.split('__')[0]].append(os.path.join(directory, name))
+    for route, files in sorted(routes.items()):
+        click.echo(f'{route}: {len(files)} profiles')
+        stats = pstats.Stats(*files, stream=click.get_text_stream('stdout'))
+        stats.strip_dirs().sort_stats(sort).print_stats(
+            top or app.config['PROFILE_TOP'])
+
+
+app.cli.add_command(data_cli)
@@ -0,0 +1,20 @@
+from hashlib import md5
+from flask import json, request, session, Response
+
+
+def make_etag(*parts):
+    return md5(json.dumps(parts).encode()).hexdigest()
+
+
+def is_fresh(etag):
+    return '_flashes' not in session and request.if_none_match.contains(etag)
+
+
+def with_etag(response, etag):
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified(etag):
+    return with_etag(Response(status=304), etag)
@@ -0,0 +1,44 @@
+from functools import partial
+from flask import g, has_request_context
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import event, orm
+from sqlalchemy.pool import QueuePool, StaticPool
+from sqlalchemy.sql.dml import UpdateBase
+
+
+def set_pragmas(pragmas, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+    cursor.close()
+
+
+class RoutingSession(SignallingSession):
+    def get_bind(self, mapper=None, clause=None):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info['primary'] = True
+        if (has_request_context() and g.get('read_only') and
+                not self.info.get('primary') and
+                'replica' in (self.app.config['SQLALCHEMY_BINDS'] or ())):
+            return get_state(self.app).db.get_engine(self.app, bind='replica')
+        return SignallingSession.get_bind(self, mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        super().apply_driver_hacks(app, sa_url, options)
+        if (app.config['DATABASE_POOL_SIZE'] and
+                options.get('poolclass') is not StaticPool):
+            options['poolclass'] = QueuePool
+            options['pool_size'] = app.config['DATABASE_POOL_SIZE']
+            options['max_overflow'] = app.config['DATABASE_MAX_OVERFLOW']
+
+    def create_engine(self, sa_url, engine_opts):
+        engine = super().create_engine(sa_url, engine_opts)
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', partial(
+                set_pragmas, self.get_app().config['SQLITE_PRAGMAS']))
+        return engine
@@ -0,0 +1,219 @@
+import json
+import sqlite3
+from collections import defaultdict, deque
+from threading import Condition, Lock, Thread
+from time import monotonic, sleep, time
+from flask import Response
+from sqlalchemy import event
+from app import app, db
+
+BOARD_CHANNEL = 'board'
+
+
+class Subscription:
+    def __init__(self, channels, size):
+        self.channels = channels
+        self.size = size
+        self.messages = deque()
+        self.ready = Condition()
+
+    def put(self, payload):
+        with self.ready:
+            if len(self.messages) >= self.size:
+                self.messages.clear()
+                payload = {'event': 'resync'}
+            self.messages.append(payload)
+            self.ready.notify()
+
+    def get(self, timeout):
+        with self.ready:
+            if not self.messages:
+                self.ready.wait(timeout)
+            messages = list(self.messages)
+            self.messages.clear()
+            return messages
+
+
+class LocalBroker:
+    def __init__(self, queue_size):
+        self.queue_size = queue_size
+        self.subscribers = defaultdict(set)
+        self.lock = Lock()
+
+    def active(self):
+        return bool(self.subscribers)
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels, self.queue_size)
+        with self.lock:
+            for channel in channels:
+                self.subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                self.subscribers[channel].discard(subscription)
+                if not self.subscribers[channel]:
+                    del self.subscribers[channel]
+
+    def publish(self, messages):
+        self.dispatch(messages)
+
+    def dispatch(self, messages):
+        with self.lock:
+            for channels, payload in messages:
+                for subscription in set().union(*(
+                        self.subscribers.get(channel, ())
+                        for channel in channels)):
+                    subscription.put(payload)
+
+
+class SQLiteBroker(LocalBroker):
+    def __init__(self, path, queue_size, poll_interval, retention):
+        super().__init__(queue_size)
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.poller = None
+        self.execute(
+            'CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY '
+            'AUTOINCREMENT, channels TEXT, payload TEXT, created REAL)'
+        )
+        self.last_id = self.execute(
+            'SELECT coalesce(max(id), 0) FROM events')[0][0]
+
+    def execute(self, sql, parameters=(), many=False):
+        connection = sqlite3.connect(self.path, timeout=5)
+        try:
+            with connection:
+                if many:
+                    connection.executemany(sql, parameters)
+                    return []
+                return connection.execute(sql, parameters).fetchall()
+        finally:
+            connection.close()
+
+    def active(self):
+        return True
+
+    def subscribe(self, channels):
+        with self.lock:
+            if self.poller is None:
+                self.poller = Thread(target=self.poll, daemon=True)
+                self.poller.start()
+        return super().subscribe(channels)
+
+    def publish(self, messages):
+        now = time()
+        self.execute(
+            'INSERT INTO events (channels, payload, created) VALUES (?, ?, ?)',
+            [(json.dumps(channels), json.dumps(payload), now)
+             for channels, payload in messages], many=True
+        )
+        self.execute('DELETE FROM events WHERE created < ?',
+                     (now - self.retention,))
+
+    def poll(self):
+        while True:
+            try:
+                rows = self.execute(
+                    'SELECT id, channels, payload FROM events WHERE id > ? '
+                    'ORDER BY id', (self.last_id,))
+                if rows:
+                    self.last_id = rows[-1][0]
+                    self.dispatch([
+                        (json.loads(channels), json.loads(payload))
+                        for _, channels, payload in rows
+                    ])
+            except sqlite3.Error:
+                app.logger.exception('Polling task events failed')
+            sleep(self.poll_interval)
+
+
+def create_broker(config):
+    url = config['EVENTS_URL']
+    queue_size = config['EVENTS_QUEUE_SIZE']
+    if url:
+        if not url.startswith('sqlite:///'):
+            raise ValueError(f'Unsupported events backend {url}')
+        return SQLiteBroker(url[len('sqlite:///'):], queue_size,
+                            config['EVENTS_POLL_INTERVAL'],
+                            config['EVENTS_RETENTION'])
+    return LocalBroker(queue_size)
+
+
+broker = create_broker(app.config)
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def user_channels(user, board=False):
+    channels = [user_channel(user.id)]
+    if board and user.type == 1:
+        channels.append(BOARD_CHANNEL)
+    return channels
+
+
+def listening():
+    return broker.active()
+
+
+def notify(kind, task_id, title, status, users_id):
+    if not broker.active():
+        return
+    pending = db.session.info.setdefault('task_events', {})
+    previous = pending.get(task_id)
+    users_id = set(users_id)
+    if previous is not None:
+        users_id.update(previous[1])
+        if previous[0]['event'] == 'created' and kind == 'updated':
+            kind = 'created'
+    pending[task_id] = {
+        'event': kind, 'task': task_id, 'title': title, 'status': status,
+    }, users_id
+
+
+@event.listens_for(db.session, 'after_commit')
+def publish_events(session):
+    pending = session.info.pop('task_events', None)
+    if not pending:
+        return
+    try:
+        broker.publish([
+            ([BOARD_CHANNEL] + [user_channel(user_id)
+                                for user_id in sorted(users_id)], payload)
+            for payload, users_id in pending.values()
+        ])
+    except Exception:
+        app.logger.exception('Publishing task events failed')
+
+
+@event.listens_for(db.session, 'after_rollback')
+def drop_events(session):
+    session.info.pop('task_events', None)
+
+
+def stream(channels):
+    subscription = broker.subscribe(channels)
+    deadline = monotonic() + app.config['EVENTS_STREAM_TIMEOUT']
+    try:
+        yield f'retry: {app.config["EVENTS_RETRY"]}\n\n'
+        while monotonic() < deadline:
+            messages = subscription.get(app.config['EVENTS_KEEPALIVE'])
+            if not messages:
+                yield ': keepalive\n\n'
+            for payload in messages:
+                yield (f'event: {payload["event"]}\n'
+                       f'data: {json.dumps(payload)}\n\n')
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def event_stream(channels):
+    response = Response(stream(channels), mimetype='text/event-stream')
+    response.cache_control.no_cache = True
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
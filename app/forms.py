@@ -4,7 +4,17 @@ from wtforms import (
     SelectMultipleField, TextAreaField
 )
 from wtforms.validators import ValidationError, DataRequired
-from app.models import User, Task
+from app import db
+from app.models import User, Task, query_in
+
+
+class UsersField(SelectMultipleField):
+    def pre_validate(self, form):
+        if self.data:
+            exist = {user_id for user_id, in query_in(
+                db.session.query(User.id), User.id, self.data)}
+            if not exist.issuperset(self.data):
+                raise ValueError('Some of the users do not exist')
 
 
 class RegistrationForm(FlaskForm):
@@ -64,7 +74,7 @@ class EditTaskForOwner(FlaskForm):
             (3, 'DONE'),
         ]
     )
-    users_id = SelectMultipleField(
+    users_id = UsersField(
         'Performers', coerce=int, validators=[DataRequired()]
     )
     delete = BooleanField('Delete')
@@ -75,7 +85,7 @@ class AddTask(FlaskForm):
     title = StringField('Title', validators=[DataRequired()])
     description = TextAreaField('Description', validators=[DataRequired()])
 
-    users_id = SelectMultipleField(
+    users_id = UsersField(
         'Performers', coerce=int, validators=[DataRequired()]
     )
     submit = SubmitField('Add')
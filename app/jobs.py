@@ -0,0 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from threading import Lock
+from flask import g, json
+from app import app, db
+from app.models import User, Job, JobChunk
+
+handlers = {}
+passwords = {}
+_executor = None
+_executor_lock = Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(app.config['JOB_WORKERS'])
+        return _executor
+
+
+def submit(function, data, user_id=None):
+    Job.purge(app.config['JOB_RETENTION'])
+    secrets = [source.get('password') if isinstance(source, dict) else None
+               for source in data]
+    job = Job.submit(function, [
+        {key: value for key, value in source.items() if key != 'password'}
+        if isinstance(source, dict) else source
+        for source in data
+    ], user_id)
+    if any(secret is not None for secret in secrets):
+        passwords[job.id] = secrets
+    get_executor().submit(run_job, job.id)
+    return job
+
+
+def run_job(job_id):
+    with app.app_context():
+        secrets = passwords.pop(job_id, ())
+        try:
+            if not Job.claim(job_id):
+                return
+            job = Job.query.get(job_id)
+            g.api_user = job.user_id and User.query.get(job.user_id)
+            handler = handlers[job.function]
+            positions = [position for position, in db.session.query(
+                JobChunk.position).filter_by(job_id=job_id, results=None
+                                             ).order_by(JobChunk.position)]
+            for position in positions:
+                chunk = JobChunk.query.get((job_id, position))
+                items = json.loads(chunk.items)
+                for item, secret in zip(items, secrets[position:]):
+                    if secret is not None:
+                        item['password'] = secret
+                results = list(handler(items))
+                for item in items:
+                    if isinstance(item, dict):
+                        item.pop('password', None)
+                chunk = JobChunk.query.get((job_id, position))
+                chunk.results = json.dumps(results)
+                job = Job.query.get(job_id)
+                job.processed += chunk.size
+                job.updated = datetime.utcnow()
+                db.session.commit()
+            job.status = 'done'
+            job.updated = datetime.utcnow()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.exception(f'Job {job_id} failed')
+            Job.query.filter_by(id=job_id).update({
+                'status': 'failed', 'error': str(e),
+                'updated': datetime.utcnow(),
+            })
+            db.session.commit()
+        finally:
+            db.session.remove()
+
+
+def purge_users(users_id):
+    for user_id in users_id:
+        User.purge(user_id)
+        yield {
+            'result': True,
+            'message': 'User successfully deleted',
+            'data': {'id': user_id},
+        }
+
+
+handlers['purge_users'] = purge_users
+
+
+@app.before_first_request
+def resume_jobs():
+    Job.purge(app.config['JOB_RETENTION'])
+    for job_id in Job.pending():
+        get_executor().submit(run_job, job_id)
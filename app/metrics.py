@@ -0,0 +1,141 @@
+import re
+from collections import defaultdict
+from threading import Lock
+from time import perf_counter
+from flask import g, request, has_request_context, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import app
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENTS_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    def __init__(self, name, help_, buckets):
+        self.name = name
+        self.help = help_
+        self.buckets = buckets
+        self.values = defaultdict(lambda: [[0] * len(buckets), 0, 0])
+
+    def observe(self, labels, value):
+        counts, _, _ = item = self.values[labels]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        item[1] += value
+        item[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}',
+                 f'# TYPE {self.name} histogram']
+        for labels, (counts, total, count) in sorted(self.values.items()):
+            labels = format_labels(labels)
+            for bound, value in zip(self.buckets, counts):
+                lines.append(
+                    f'{self.name}_bucket{{{labels},le="{bound}"}} {value}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return lines
+
+
+class CounterMetric:
+    def __init__(self, name, help_):
+        self.name = name
+        self.help = help_
+        self.values = defaultdict(int)
+
+    def inc(self, labels, value=1):
+        self.values[labels] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}',
+                 f'# TYPE {self.name} counter']
+        for labels, value in sorted(self.values.items()):
+            lines.append(f'{self.name}{{{format_labels(labels)}}} {value}')
+        return lines
+
+
+def format_labels(labels):
+    return ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace(
+            '"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+
+
+lock = Lock()
+request_duration = Histogram(
+    'http_request_duration_seconds', 'Request latency.', DURATION_BUCKETS)
+request_statements = Histogram(
+    'http_request_sql_statements', 'SQL statements issued per request.',
+    STATEMENTS_BUCKETS)
+request_sql_duration = Histogram(
+    'http_request_sql_duration_seconds', 'Time spent in SQL per request.',
+    DURATION_BUCKETS)
+slow_queries = CounterMetric(
+    'sql_slow_queries_total', 'Statements slower than SLOW_QUERY_THRESHOLD.')
+all_metrics = (request_duration, request_statements, request_sql_duration,
+               slow_queries)
+
+
+def get_endpoint():
+    return request.endpoint or 'unknown'
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    conn.info.setdefault('query_started', []).append(perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context,
+                         executemany):
+    duration = perf_counter() - conn.info['query_started'].pop()
+    if not has_request_context() or 'metrics_started' not in g:
+        return
+    g.sql_statements += 1
+    g.sql_duration += duration
+    if duration > app.config['SLOW_QUERY_THRESHOLD']:
+        statement = re.sub(r'\s+', ' ', statement)[:200]
+        app.logger.warning(
+            f'Slow query on {get_endpoint()} ({duration:.3f}s): {statement}')
+        with lock:
+            slow_queries.inc(
+                (('endpoint', get_endpoint()), ('statement', statement)))
+
+
+@event.listens_for(Engine, 'handle_error')
+def handle_error(context):
+    if context.connection is not None:
+        context.connection.info.get('query_started', [None]).pop()
+
+
+@app.before_request
+def start_timer():
+    g.metrics_started = perf_counter()
+    g.sql_statements = 0
+    g.sql_duration = 0
+
+
+@app.after_request
+def record_request(response):
+    if 'metrics_started' in g:
+        labels = (('endpoint', get_endpoint()), ('method', request.method),
+                  ('status', response.status_code))
+        with lock:
+            request_duration.observe(
+                labels, perf_counter() - g.metrics_started)
+            request_statements.observe(labels, g.sql_statements)
+            request_sql_duration.observe(labels, g.sql_duration)
+    return response
+
+
+@app.route('/metrics')
+def metrics():
+    with lock:
+        lines = [line for metric in all_metrics for line in metric.render()]
+    return Response('\n'.join(lines) + '\n',
+                    mimetype='text/plain; version=0.0.4')
@@ -1,13 +1,107 @@
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from itertools import count, islice
+from time import sleep
+from uuid import uuid4
+from dateutil.parser import isoparse
+from dateutil.tz import tzutc
+from flask import json
 from flask_login import UserMixin
+from itsdangerous import BadData, URLSafeTimedSerializer
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import make_transient_to_detached
 from werkzeug.security import generate_password_hash, check_password_hash
-from app import db, login
+from app import app, db, login
+from app.cache import create_cache
+from app.events import listening, notify
+
+
+def chunked(items, size):
+    items = iter(items)
+    chunk = list(islice(items, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(items, size))
+
+
+def query_in(query, column, values):
+    result = []
+    for chunk in chunked(set(values), app.config['SQL_IN_CHUNK_SIZE']):
+        result.extend(query.filter(column.in_(chunk)).all())
+    return result
+
+
+def iso_week_label(column):
+    thursday = db.func.date(column, '-3 days', 'weekday 4')
+    week = (db.cast(db.func.strftime('%j', thursday), db.Integer) - 1) / 7
+    return db.func.strftime('%Y', thursday).concat('-W').concat(
+        db.func.printf('%02d', week + 1))
+
+
+def period_label(column, period):
+    if period not in PERIODS:
+        raise ValueError(f'Unknown period {period}')
+    if db.engine.name == 'postgresql':
+        return db.func.to_char(column, PERIODS[period][1])
+    if PERIODS[period][0] is None:
+        return iso_week_label(column)
+    return db.func.strftime(PERIODS[period][0], column)
+
+
+def seconds_since(column, now):
+    now = db.literal(now, db.DateTime)
+    if db.engine.name == 'postgresql':
+        return db.extract('epoch', now - column)
+    return (db.func.julianday(now) - db.func.julianday(column)) * 86400
+
+
+def parse_datetime(value):
+    value = isoparse(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(tzutc()).replace(tzinfo=None)
+    return value
+
+
+_hash_pool = None
+
+
+def hash_passwords(passwords):
+    global _hash_pool
+    workers = app.config['PASSWORD_HASH_WORKERS'] or None
+    if len(passwords) < 2 or workers == 1:
+        return [generate_password_hash(password) for password in passwords]
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(workers)
+    return list(_hash_pool.map(generate_password_hash, passwords))
+
+
+STATUSES = ('to_do', 'in_progress', 'on_review', 'done')
+PERIODS = {
+    'day': ('%Y-%m-%d', 'YYYY-MM-DD'),
+    'week': (None, 'IYYY-"W"IW'),
+    'month': ('%Y-%m', 'YYYY-MM'),
+}
+
+
+def task_started(context):
+    return context.connection.execute(db.select([Task.started]).where(
+        Task.id == context.get_current_parameters()['task_id'])).scalar()
+
 
 users_tasks = db.Table(
     'users_tasks',
-    db.Column('user_id', db.Integer, db.ForeignKey('user.id')),
-    db.Column('task_id', db.Integer, db.ForeignKey('task.id')),
+    db.Column('user_id', db.Integer, db.ForeignKey('user.id'),
+              primary_key=True),
+    db.Column('task_id', db.Integer, db.ForeignKey('task.id'),
+              primary_key=True),
+    db.Column('started', db.DateTime, default=task_started),
+    db.Index('ix_users_tasks_task_id_user_id', 'task_id', 'user_id'),
+    db.Index('ix_users_tasks_user_id_started',
+             'user_id', 'started', 'task_id'),
 )
+PERFORMER_KEYS = users_tasks.c.started, users_tasks.c.task_id
 
 
 class User(UserMixin, db.Model):
@@ -18,6 +112,8 @@ class User(UserMixin, db.Model):
     last_name = db.Column(db.String(64))
     type = db.Column(db.Integer, default=0)
     password_hash = db.Column(db.String(256))
+    version = db.Column(db.Integer, nullable=False, default=1,
+                        server_default='1')
     tasks = db.relationship(
         'Task', secondary=users_tasks, backref=db.backref('users'),
         lazy='dynamic'
@@ -29,7 +125,11 @@ class User(UserMixin, db.Model):
         foreign_keys='Task.author_id'
     )
 
-    def get_json(self):
+    def get_json(self, assign_tasks=None, tasks=None):
+        if assign_tasks is None:
+            assign_tasks = [task.title for task in self.assign_tasks]
+        if tasks is None:
+            tasks = [task.title for task in self.tasks]
         return {'result': True,
                 'message': 'Success',
                 'data': {
@@ -38,13 +138,39 @@ class User(UserMixin, db.Model):
                     'first_name': self.first_name,
                     'last_name': self.last_name,
                     'type': self.type,
-                    'assign_tasks': [task.title for task in self.assign_tasks],
-                    'tasks': [task.title for task in self.tasks]
+                    'assign_tasks': assign_tasks,
+                    'tasks': tasks,
                 }}
 
+    @staticmethod
+    def tasks_titles(users):
+        users_id = [user.id for user in users]
+        assign_tasks, tasks = defaultdict(list), defaultdict(list)
+        for author_id, title in query_in(
+                db.session.query(Task.author_id, Task.title)
+                .order_by(Task.id),
+                Task.author_id, users_id):
+            assign_tasks[author_id].append(title)
+        for user_id, title in query_in(
+                db.session.query(users_tasks.c.user_id, Task.title)
+                .join(users_tasks).order_by(Task.id),
+                users_tasks.c.user_id, users_id):
+            tasks[user_id].append(title)
+        return assign_tasks, tasks
+
     def __repr__(self):
         return f'<User {self.login}>'
 
+    def get_identity(self):
+        return {
+            'id': self.id,
+            'login': self.login,
+            'email': self.email,
+            'first_name': self.first_name,
+            'last_name': self.last_name,
+            'type': self.type,
+        }
+
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
 
@@ -60,49 +186,182 @@ class User(UserMixin, db.Model):
         user.set_password(source['password'])
         db.session.add(user)
         db.session.commit()
+        performers_cache.delete('all')
         return user
 
+    @staticmethod
+    def bulk_create(sources, restore=False):
+        exist = set()
+        for chunk in chunked(sources, app.config['SQL_IN_CHUNK_SIZE']):
+            for user_login, email in db.session.query(
+                    User.login, User.email).filter(db.or_(
+                    User.login.in_({source['login'] for source in chunk}),
+                    User.email.in_({source['email'] for source in chunk}),
+            )):
+                exist.update((('login', user_login), ('email', email)))
+
+        result, users = [], []
+        for source in sources:
+            keys = (('login', source['login']), ('email', source['email']))
+            if any(key in exist for key in keys):
+                result.append((False, 'User exist'))
+                continue
+            exist.update(keys)
+            users.append(source)
+            result.append((True, 'User successfully added'))
+
+        if users:
+            hashed = [restore and source.get('password_hash')
+                      for source in users]
+            passwords_hash = iter(hash_passwords([
+                source['password']
+                for source, password_hash in zip(users, hashed)
+                if not password_hash
+            ]))
+            db.session.execute(User.__table__.insert(), [{
+                'login': source['login'],
+                'email': source['email'],
+                'first_name': source['first_name'],
+                'last_name': source['last_name'],
+                'type': source['type'],
+                'password_hash': password_hash or next(passwords_hash),
+            } for source, password_hash in zip(users, hashed)])
+        db.session.commit()
+        performers_cache.delete('all')
+        return result
+
     @staticmethod
     def edit(user, source):
+        user_id = user.id
         if source.get('delete', False):
-            for task in user.assign_tasks:
-                db.session.delete(task)
-            db.session.delete(user)
+            db.session.expunge(user)
+            User.bulk_delete(user_id)
         else:
+            if source.get('login', user.login) != user.login:
+                Task.bump(db.or_(
+                    Task.author_id == user_id,
+                    Task.id.in_(db.select([users_tasks.c.task_id]).where(
+                        users_tasks.c.user_id == user_id)),
+                ))
+            user.version = User.version + 1
             user.login = source.get('login', user.login)
             user.email = source.get('email', user.email)
             user.first_name = source.get('first_name', user.first_name)
             user.last_name = source.get('last_name', user.last_name)
             user.type = source.get('type', user.type)
         db.session.commit()
+        user_cache.delete(str(user_id))
+        performers_cache.delete('all')
+
+    @staticmethod
+    def bulk_delete(user_id):
+        Task.bulk_delete(Task.author_id == user_id)
+        Task.bump(Task.id.in_(db.select([users_tasks.c.task_id]).where(
+            users_tasks.c.user_id == user_id)))
+        db.session.execute(
+            users_tasks.delete().where(users_tasks.c.user_id == user_id))
+        TaskCounter.query.filter_by(user_id=user_id).delete()
+        User.query.filter_by(id=user_id).delete()
+
+    @staticmethod
+    def bump(users_id):
+        for chunk in chunked(users_id, app.config['SQL_IN_CHUNK_SIZE']):
+            db.session.execute(User.__table__.update().where(
+                User.id.in_(chunk)).values(version=User.version + 1))
+
+    @staticmethod
+    def purge(user_id):
+        while True:
+            tasks_id = [task_id for task_id, in db.session.query(
+                Task.id).filter_by(author_id=user_id).limit(
+                app.config['BULK_CHUNK_SIZE'])]
+            if not tasks_id:
+                break
+            Task.bulk_delete(Task.id.in_(tasks_id))
+            db.session.commit()
+            sleep(app.config['PURGE_PAUSE'])
+        User.bulk_delete(user_id)
+        db.session.commit()
+        user_cache.delete(str(user_id))
+        performers_cache.delete('all')
+
+    @staticmethod
+    def performer_choices(selected=()):
+        choices = performers_cache.get('all')
+        if choices is None:
+            choices = []
+            if User.query.count() <= app.config['PERFORMER_CHOICES_LIMIT']:
+                choices = [[user_id, user_login] for user_id, user_login in
+                           db.session.query(User.id, User.login).order_by(
+                               User.login)]
+            performers_cache.set('all', choices)
+        missing = set(selected or ()).difference(
+            user_id for user_id, user_login in choices)
+        if missing:
+            choices = choices + query_in(
+                db.session.query(User.id, User.login), User.id, missing)
+        return [(user_id, user_login) for user_id, user_login in choices]
+
+    @staticmethod
+    def autocomplete(prefix, limit=None):
+        query = db.session.query(User.id, User.login)
+        if prefix:
+            query = query.filter(User.login >= prefix,
+                                 User.login < prefix + '\U0010ffff')
+        return query.order_by(User.login).limit(
+            limit or app.config['AUTOCOMPLETE_LIMIT']).all()
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    @staticmethod
+    def token_serializer():
+        return URLSafeTimedSerializer(app.config['SECRET_KEY'], 'api-token')
+
+    def get_token(self):
+        return User.token_serializer().dumps({'id': self.id})
+
+    @staticmethod
+    def verify_token(token):
+        try:
+            data = User.token_serializer().loads(
+                token, max_age=app.config['API_TOKEN_EXPIRES_IN'])
+        except BadData:
+            return None
+        return User.query.get(data['id'])
+
     def tasks_quantity(self):
-        to = self.tasks
-        by = self.assign_tasks.all()
-        return {
-            'to': {
-                'all': to.count(),
-                'to_do': sum(i.status == 0 for i in to),
-                'in_progress': sum(i.status == 1 for i in to),
-                'on_review': sum(i.status == 2 for i in to),
-                'done': sum(i.status == 3 for i in to),
-            },
-            'by': {
-                'all': len(by),
-                'to_do': sum(i.status == 0 for i in by),
-                'in_progress': sum(i.status == 1 for i in by),
-                'on_review': sum(i.status == 2 for i in by),
-                'done': sum(i.status == 3 for i in by),
-            },
+        counters = {
+            (counter.role, counter.status): counter.quantity
+            for counter in TaskCounter.query.filter_by(user_id=self.id)
         }
+        if not counters:
+            counters = TaskCounter.rebuild(self.id)
+        stat = {}
+        for role in ('to', 'by'):
+            stat[role] = {
+                name: counters[role, status]
+                for status, name in enumerate(STATUSES)
+            }
+            stat[role]['all'] = sum(stat[role].values())
+        return stat
+
+
+user_cache = create_cache(app.config, 'user')
+performers_cache = create_cache(app.config, 'performers')
 
 
 @login.user_loader
 def load_user(id_):
-    return User.query.get(int(id_))
+    identity = user_cache.get(id_)
+    if identity is None:
+        user = User.query.get(int(id_))
+        if user is not None:
+            user_cache.set(id_, user.get_identity())
+        return user
+    user = User(**identity)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
 
 
 class Task(db.Model):
@@ -113,6 +372,16 @@ class Task(db.Model):
     status = db.Column(db.Integer, default=0)
     started = db.Column(db.DateTime, index=True, default=datetime.utcnow)
     finished = db.Column(db.DateTime, index=True, nullable=True)
+    active_time = db.Column(db.Float, default=0)
+    resumed = db.Column(db.DateTime, nullable=True)
+    version = db.Column(db.Integer, nullable=False, default=1,
+                        server_default='1')
+
+    __table_args__ = (
+        db.Index('ix_task_status_started', 'status', 'started', 'id'),
+        db.Index('ix_task_author_id_started', 'author_id', 'started', 'id'),
+        db.Index('ix_task_author_id_status', 'author_id', 'status'),
+    )
 
     def __repr__(self):
         return f'<Task {self.title}>'
@@ -123,11 +392,63 @@ class Task(db.Model):
                 'data': {
                     'title': self.title,
                     'description': self.description,
-                    'author': User.query.get(self.author_id).login,
+                    'author': self.author.login,
                     'status': self.status,
                     'users': [user.login for user in self.users],
                 }}
 
+    @staticmethod
+    def query_eager():
+        return Task.query.options(
+            db.joinedload(Task.author), db.selectinload(Task.users)
+        )
+
+    @staticmethod
+    def page_query(query, cursor, per_page, keys=None):
+        started, id_ = keys or (Task.started, Task.id)
+        if cursor is not None:
+            query = query.filter(db.tuple_(started, id_) < db.tuple_(*cursor))
+        return query.order_by(started.desc(), id_.desc()).limit(per_page + 1)
+
+    @staticmethod
+    def status_in(statuses):
+        if len(statuses) == 1:
+            return Task.status.in_(statuses)
+        return (Task.status + 0).in_(statuses)
+
+    @staticmethod
+    def page_rows(query, cursor=None, per_page=None, keys=None):
+        per_page = per_page or app.config['TASKS_PER_PAGE']
+        rows = Task.page_query(
+            query.with_entities(Task.id, Task.version, Task.started),
+            cursor, per_page, keys).all()
+        if len(rows) > per_page:
+            row = rows[per_page - 1]
+            return rows[:per_page], Task.make_cursor(row.started, row.id)
+        return rows, None
+
+    @staticmethod
+    def load_page(rows):
+        tasks = {task.id: task for task in query_in(
+            Task.query_eager(), Task.id, [row.id for row in rows])}
+        return [tasks[row.id] for row in rows]
+
+    @staticmethod
+    def page(query, cursor=None, per_page=None, keys=None):
+        rows, next_page = Task.page_rows(query, cursor, per_page, keys)
+        return Task.load_page(rows), next_page
+
+    @staticmethod
+    def make_cursor(started, id_):
+        return urlsafe_b64encode(
+            f'{started:%Y-%m-%dT%H:%M:%S.%f},{id_}'.encode()
+        ).decode()
+
+    @staticmethod
+    def parse_cursor(cursor):
+        started, id_ = urlsafe_b64decode(cursor.encode()).decode().split(',')
+        return datetime.strptime(started, '%Y-%m-%dT%H:%M:%S.%f'), int(id_)
+
     @staticmethod
     def create(source):
         author_id = source.get('author_id') or User.query.filter_by(
@@ -136,61 +457,289 @@ class Task(db.Model):
             title=source['title'],
             description=source['description'],
             author_id=author_id,
+            status=0,
             started=datetime.utcnow(),
         )
-        for user_id in source.get('users_id', ''):
-            task.users.append(User.query.get(user_id))
-        for user_login in source.get('users', ''):
-            task.users.append(User.query.filter_by(login=user_login).first())
+        task.active_time, task.resumed, created = Task.tracking(
+            task.status, task.started, None)
+        db.session.add(TaskEvent(
+            task=task, status=task.status, created=created, active=0))
+        task.users = User.query.filter(db.or_(
+            User.id.in_(source.get('users_id', ())),
+            User.login.in_(source.get('users', ())),
+        )).all()
 
         db.session.add(task)
+        deltas = task.counters(1)
+        TaskCounter.update(deltas)
+        users_id = {user_id for user_id, role, status in deltas}
+        User.bump(users_id)
+        db.session.flush()
+        notify('created', task.id, task.title, task.status, users_id)
         db.session.commit()
         return task
 
+    @staticmethod
+    def bulk_create(sources, restore=False):
+        titles = {source['title'] for source in sources}
+        exist = {title for title, in query_in(
+            db.session.query(Task.title), Task.title, titles)}
+
+        keys = set()
+        for source in sources:
+            if source.get('author_id'):
+                keys.add(('id', source['author_id']))
+            else:
+                keys.add(('login', source.get('author', '')))
+            keys.update(('login', user_login)
+                        for user_login in source.get('users', ''))
+            keys.update(('id', user_id)
+                        for user_id in source.get('users_id', ''))
+        users_id, known = {}, set()
+        for chunk in chunked(keys, app.config['SQL_IN_CHUNK_SIZE']):
+            criteria = [column.in_({value for key, value in chunk
+                                    if key == name})
+                        for name, column in (('login', User.login),
+                                             ('id', User.id))
+                        if any(key == name for key, value in chunk)]
+            for user_login, user_id in db.session.query(
+                    User.login, User.id).filter(db.or_(*criteria)):
+                users_id[user_login] = user_id
+                known.add(user_id)
+
+        result, tasks, performers, deltas = [], [], {}, Counter()
+        events, authors = {}, {}
+        for source in sources:
+            author_id = (source.get('author_id') or
+                         users_id.get(source.get('author', '')))
+            if author_id not in known:
+                author_id = None
+            users = {user_id if user_id in known else None
+                     for user_id in source.get('users_id', '')}
+            users.update(users_id.get(user_login)
+                         for user_login in source.get('users', ''))
+            if source['title'] in exist:
+                result.append((False, 'Task exist'))
+            elif author_id is None or None in users:
+                result.append((False, 'User no exist'))
+            else:
+                exist.add(source['title'])
+                task = {
+                    'title': source['title'],
+                    'description': source['description'],
+                    'author_id': author_id,
+                    'status': 0,
+                    'started': datetime.utcnow(),
+                    'finished': None,
+                }
+                if restore:
+                    task['status'] = source.get('status', 0)
+                    task['started'] = source.get('started') or task['started']
+                    task['finished'] = source.get('finished')
+                task['active_time'], task['resumed'], created = Task.tracking(
+                    task['status'], task['started'], task['finished'])
+                events[source['title']] = {
+                    'previous': None,
+                    'status': task['status'],
+                    'created': created,
+                    'active': task['active_time'],
+                }
+                tasks.append(task)
+                performers[source['title']] = users
+                authors[source['title']] = author_id
+                deltas[author_id, 'by', task['status']] += 1
+                deltas.update(
+                    (user_id, 'to', task['status']) for user_id in users)
+                result.append((True, 'Task successfully added'))
+
+        if tasks:
+            db.session.execute(Task.__table__.insert(), tasks)
+            tasks_id = query_in(
+                db.session.query(Task.title, Task.id), Task.title, performers)
+            started = {task['title']: task['started'] for task in tasks}
+            rows = [{'user_id': user_id, 'task_id': task_id,
+                     'started': started[title]}
+                    for title, task_id in tasks_id
+                    for user_id in performers[title]]
+            if rows:
+                db.session.execute(users_tasks.insert(), rows)
+            db.session.execute(TaskEvent.__table__.insert(), [
+                dict(events[title], task_id=task_id)
+                for title, task_id in tasks_id
+            ])
+            for title, task_id in tasks_id:
+                notify('created', task_id, title, events[title]['status'],
+                       performers[title] | {authors[title]})
+            TaskCounter.update(deltas)
+            User.bump({user_id for user_id, role, status in deltas})
+        db.session.commit()
+        return result
+
     @staticmethod
     def edit(task, source):
         if source.get('delete', False):
-            db.session.delete(task)
+            db.session.expunge(task)
+            Task.bulk_delete(Task.id == task.id)
         else:
+            deltas = task.counters(-1)
+            if source.get('title', task.title) != task.title:
+                User.bump(user_id for user_id, role, status in deltas)
+            task.version = Task.version + 1
             task.title = source.get('title', task.title)
             task.description = source.get('description', task.description)
-
-            if task.status != 3 == source.get('status', 0):
-                task.finished = datetime.utcnow()
-            task.status = source.get('status', task.status)
-            if source.get('users_id') is not None:
-                users_id = {user.id for user in task.users}
-                for user_id in source.get('users_id', ''):
-                    if user_id not in users_id:
-                        task.users.append(User.query.get(user_id))
-
-                new_users_id = set(source.get('users_id', users_id))
-                for user in task.users:
-                    if user.id not in new_users_id:
-                        task.users.remove(user)
-            else:
-                users_login = {user.login for user in task.users}
-                for user_login in source.get('users', ''):
-                    if user_login not in users_login:
-                        task.users.append(
-                            User.query.filter_by(login=user_login).first())
-
-                new_users_login = set(source.get('users_login', users_login))
-                for user in task.users:
-                    if user.login not in new_users_login:
-                        task.users.remove(user)
+            task.set_status(source.get('status', task.status))
+            deltas.update(task.counters(1))
+            if ((source.get('users_id') is not None or
+                 source.get('users') is not None) and
+                    not Task.bulk_set_users([task], [source])[0]):
+                db.session.rollback()
+                return False
+            TaskCounter.update(deltas)
+            notify('updated', task.id, task.title, task.status,
+                   {user_id for user_id, role, status in deltas})
         db.session.commit()
+        return True
+
+    @staticmethod
+    def bulk_delete(criterion):
+        deltas = Counter()
+        for author_id, status, quantity in db.session.query(
+                Task.author_id, Task.status, db.func.count()
+        ).filter(criterion).group_by(Task.author_id, Task.status):
+            deltas[author_id, 'by', status] -= quantity
+        for user_id, status, quantity in db.session.query(
+                users_tasks.c.user_id, Task.status, db.func.count()
+        ).join(Task).filter(criterion).group_by(
+                users_tasks.c.user_id, Task.status):
+            deltas[user_id, 'to', status] -= quantity
+        if listening():
+            performers = defaultdict(set)
+            for task_id, user_id in db.session.query(
+                    users_tasks.c.task_id, users_tasks.c.user_id
+            ).join(Task).filter(criterion):
+                performers[task_id].add(user_id)
+            for task_id, title, status, author_id in db.session.query(
+                    Task.id, Task.title, Task.status, Task.author_id
+            ).filter(criterion):
+                notify('deleted', task_id, title, status,
+                       performers[task_id] | {author_id})
+        TaskCounter.update(deltas)
+        User.bump({user_id for user_id, role, status in deltas})
+        db.session.execute(TaskEvent.__table__.delete().where(
+            TaskEvent.task_id.in_(db.select([Task.id]).where(criterion))
+        ))
+        db.session.execute(users_tasks.delete().where(
+            users_tasks.c.task_id.in_(db.select([Task.id]).where(criterion))
+        ))
+        db.session.execute(Task.__table__.delete().where(criterion))
+
+    @staticmethod
+    def bulk_set_users(tasks, sources):
+        users_id, logins = set(), set()
+        for source in sources:
+            users_id.update(source.get('users_id') or ())
+            logins.update(source.get('users') or ())
+        query = db.session.query(User.id, User.login)
+        exist = {user_id for user_id, user_login in query_in(
+            query, User.id, users_id)}
+        by_login = dict((user_login, user_id) for user_id, user_login in
+                        query_in(query, User.login, logins))
+        exist.update(by_login.values())
+
+        current = defaultdict(set)
+        for task_id, user_id in query_in(
+                db.session.query(users_tasks.c.task_id, users_tasks.c.user_id),
+                users_tasks.c.task_id, [task.id for task in tasks]):
+            current[task_id].add(user_id)
+
+        result, new = [], {}
+        for task, source in zip(tasks, sources):
+            if source.get('users_id') is None and source.get('users') is None:
+                result.append(False)
+                continue
+            users = set(source.get('users_id') or ())
+            users.update(by_login.get(user_login)
+                         for user_login in source.get('users') or ())
+            if users <= exist:
+                new[task.id] = task, users
+            result.append(users <= exist)
+
+        added, removed, deltas, changed = [], [], Counter(), []
+        for task_id, (task, users) in new.items():
+            for user_id in users - current[task_id]:
+                added.append({'user_id': user_id, 'task_id': task_id,
+                              'started': task.started})
+                deltas[user_id, 'to', task.status] += 1
+            for user_id in current[task_id] - users:
+                removed.append({'user_id_': user_id, 'task_id_': task_id})
+                deltas[user_id, 'to', task.status] -= 1
+            if users != current[task_id]:
+                changed.append(task_id)
+                notify('updated', task_id, task.title, task.status,
+                       users | current[task_id] | {task.author_id})
+                db.session.expire(task, ['users', 'version'])
+        if added:
+            db.session.execute(users_tasks.insert(), added)
+        if removed:
+            db.session.execute(users_tasks.delete().where(db.and_(
+                users_tasks.c.user_id == db.bindparam('user_id_'),
+                users_tasks.c.task_id == db.bindparam('task_id_'),
+            )), removed)
+        TaskCounter.update(deltas)
+        User.bump({user_id for user_id, role, status in deltas})
+        for chunk in chunked(changed, app.config['SQL_IN_CHUNK_SIZE']):
+            Task.bump(Task.id.in_(chunk))
+        return result
+
+    @staticmethod
+    def bump(criterion):
+        db.session.execute(Task.__table__.update().where(criterion).values(
+            version=Task.version + 1))
 
     def edit_status(self, status):
-        self.status = status
-        if self.status == 3:
-            self.finished = datetime.utcnow()
+        self.version = Task.version + 1
+        deltas = self.counters(-1)
+        self.set_status(status)
+        deltas.update(self.counters(1))
+        TaskCounter.update(deltas)
+        notify('updated', self.id, self.title, self.status,
+               {user_id for user_id, role, status in deltas})
         db.session.commit()
 
+    def counters(self, delta):
+        deltas = Counter({(self.author_id, 'by', self.status): delta})
+        for user_id in {user.id for user in self.users}:
+            deltas[user_id, 'to', self.status] += delta
+        return deltas
+
+    def set_status(self, status):
+        if status == self.status:
+            return
+        now = datetime.utcnow()
+        active = 0
+        if self.resumed is not None:
+            active = (now - self.resumed).total_seconds()
+            self.active_time = (self.active_time or 0) + active
+        self.resumed = None if status == 3 else now
+        if status == 3:
+            self.finished = now
+        db.session.add(TaskEvent(task=self, previous=self.status,
+                                 status=status, created=now, active=active))
+        self.status = status
+
+    @staticmethod
+    def tracking(status, started, finished):
+        if status != 3:
+            return 0, started, started
+        if finished is None:
+            return 0, None, started
+        return (finished - started).total_seconds(), None, finished
+
     def timedelta(self):
-        if self.finished and self.status == 3:
-            return self.finished - self.started
-        return datetime.utcnow() - self.started
+        active = timedelta(seconds=self.active_time or 0)
+        if self.resumed is not None:
+            active += datetime.utcnow() - self.resumed
+        return active
 
     def get_text_status(self):
         if self.status == 0:
@@ -202,7 +751,238 @@ class Task(db.Model):
         return 'DONE'
 
     def get_author(self):
-        return User.query.get(self.author_id)
+        return self.author
 
     def get_users_name(self):
         return ', '.join(map(lambda x: x.login, self.users))
+
+
+class TaskEvent(db.Model):
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    task_id = db.Column(db.Integer, db.ForeignKey('task.id'), index=True)
+    previous = db.Column(db.Integer, nullable=True)
+    status = db.Column(db.Integer)
+    created = db.Column(db.DateTime, default=datetime.utcnow)
+    active = db.Column(db.Float, default=0)
+    task = db.relationship('Task')
+
+    __table_args__ = (
+        db.Index('ix_task_event_created', 'created', 'task_id', 'active'),
+    )
+
+    def __repr__(self):
+        return f'<TaskEvent {self.task_id} {self.previous} {self.status}>'
+
+    @staticmethod
+    def rollup(role, period, since=None, until=None, users_id=None):
+        if role == 'to':
+            owner = users_tasks.c.user_id
+            events = db.session.query(owner).join(
+                TaskEvent, TaskEvent.task_id == users_tasks.c.task_id)
+            running = db.session.query(owner).join(
+                Task, Task.id == users_tasks.c.task_id)
+        elif role == 'by':
+            owner = Task.author_id
+            events = db.session.query(owner).join(
+                TaskEvent, TaskEvent.task_id == Task.id)
+            running = db.session.query(owner)
+        else:
+            raise ValueError(f'Unknown role {role}')
+        if users_id is not None:
+            events = events.filter(owner.in_(users_id))
+            running = running.filter(owner.in_(users_id))
+
+        label = period_label(TaskEvent.created, period)
+        events = events.add_columns(
+            label, db.func.sum(TaskEvent.active)
+        ).filter(TaskEvent.active > 0).group_by(owner, label)
+        if since is not None:
+            events = events.filter(TaskEvent.created >= since)
+        if until is not None:
+            events = events.filter(TaskEvent.created < until)
+        totals = Counter({(user_id, label_): seconds
+                          for user_id, label_, seconds in events})
+
+        now = datetime.utcnow()
+        if (since is None or since <= now) and (until is None or now < until):
+            now_label = db.session.query(
+                period_label(db.literal(now, db.DateTime), period)).scalar()
+            for user_id, seconds in running.add_columns(db.func.sum(
+                    seconds_since(Task.resumed, now)
+            )).filter(Task.resumed.isnot(None)).group_by(owner):
+                totals[user_id, now_label] += seconds
+        return totals
+
+
+class TaskCounter(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    role = db.Column(db.String(2), primary_key=True)
+    status = db.Column(db.Integer, primary_key=True)
+    quantity = db.Column(db.Integer, default=0)
+
+    def __repr__(self):
+        return f'<TaskCounter {self.user_id} {self.role} {self.status}>'
+
+    @staticmethod
+    def update(deltas):
+        rows = [
+            {'user_id_': user_id, 'role_': role, 'status_': status,
+             'delta': delta}
+            for (user_id, role, status), delta in deltas.items() if delta
+        ]
+        if not rows:
+            return
+        table = TaskCounter.__table__
+        db.session.execute(
+            table.update().where(db.and_(
+                table.c.user_id == db.bindparam('user_id_'),
+                table.c.role == db.bindparam('role_'),
+                table.c.status == db.bindparam('status_'),
+            )).values(quantity=table.c.quantity + db.bindparam('delta')),
+            rows
+        )
+
+    @staticmethod
+    def lock():
+        db.session.info['primary'] = True
+        connection = db.session.connection()
+        if connection.dialect.name == 'sqlite':
+            if not connection.connection.in_transaction:
+                connection.execute('BEGIN IMMEDIATE')
+        elif connection.dialect.name == 'postgresql':
+            connection.execute(
+                'LOCK TABLE task_counter IN SHARE ROW EXCLUSIVE MODE')
+
+    @staticmethod
+    def rebuild(user_id):
+        TaskCounter.lock()
+        stored = {
+            (counter.role, counter.status): counter.quantity
+            for counter in TaskCounter.query.filter_by(user_id=user_id)
+        }
+        if stored:
+            db.session.commit()
+            return stored
+        counters = {
+            (role, status): 0
+            for role in ('to', 'by') for status in range(len(STATUSES))
+        }
+        quantity = db.func.count(Task.id.distinct())
+        for status, value in db.session.query(Task.status, quantity).join(
+                users_tasks).filter(users_tasks.c.user_id == user_id
+                                    ).group_by(Task.status):
+            counters['to', status] = value
+        for status, value in db.session.query(Task.status, quantity).filter(
+                Task.author_id == user_id).group_by(Task.status):
+            counters['by', status] = value
+        try:
+            db.session.execute(TaskCounter.__table__.insert(), [
+                {'user_id': user_id, 'role': role, 'status': status,
+                 'quantity': value}
+                for (role, status), value in counters.items()
+            ])
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+        return counters
+
+
+class Job(db.Model):
+    id = db.Column(db.String(32), primary_key=True)
+    function = db.Column(db.String(32))
+    status = db.Column(db.String(8), index=True, default='queued')
+    user_id = db.Column(db.Integer, nullable=True)
+    total = db.Column(db.Integer, default=0)
+    processed = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created = db.Column(db.DateTime, default=datetime.utcnow)
+    updated = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.function} {self.status}>'
+
+    def get_json(self, offset=0, limit=None):
+        if limit is None:
+            limit = app.config['API_MAX_PAGE_SIZE']
+        results = []
+        for position, chunk in db.session.query(
+                JobChunk.position, JobChunk.results
+        ).filter(
+            JobChunk.job_id == self.id,
+            JobChunk.results.isnot(None),
+            JobChunk.position + JobChunk.size > offset,
+            JobChunk.position < offset + limit,
+        ).order_by(JobChunk.position):
+            start = max(offset - position, 0)
+            results.extend(json.loads(chunk)[start:start + limit - len(
+                results)])
+        return {'result': True,
+                'message': 'Success',
+                'data': {
+                    'job': self.id,
+                    'function': self.function,
+                    'status': self.status,
+                    'total': self.total,
+                    'processed': self.processed,
+                    'error': self.error,
+                    'offset': offset,
+                    'results': results,
+                }}
+
+    @staticmethod
+    def submit(function, data, user_id=None):
+        job = Job(id=uuid4().hex, function=function, status='queued',
+                  user_id=user_id, total=len(data), processed=0)
+        db.session.add(job)
+        db.session.flush()
+        size = app.config['BULK_CHUNK_SIZE']
+        db.session.execute(JobChunk.__table__.insert(), [
+            {'job_id': job.id, 'position': position, 'size': len(chunk),
+             'items': json.dumps(chunk)}
+            for position, chunk in zip(count(0, size), chunked(data, size))
+        ])
+        db.session.commit()
+        return job
+
+    @staticmethod
+    def claim(job_id):
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=app.config['JOB_STALE_AFTER'])
+        claimed = db.session.execute(Job.__table__.update().where(db.and_(
+            Job.id == job_id,
+            db.or_(Job.status == 'queued', db.and_(
+                Job.status == 'running', Job.updated < stale)),
+        )).values(status='running', updated=now)).rowcount
+        db.session.commit()
+        return claimed == 1
+
+    @staticmethod
+    def purge(retention):
+        expired = db.select([Job.id]).where(db.and_(
+            Job.status.in_(('done', 'failed')),
+            Job.updated < datetime.utcnow() - timedelta(seconds=retention),
+        ))
+        db.session.execute(JobChunk.__table__.delete().where(
+            JobChunk.job_id.in_(expired)))
+        db.session.execute(Job.__table__.delete().where(Job.id.in_(expired)))
+        db.session.commit()
+
+    @staticmethod
+    def pending():
+        stale = datetime.utcnow() - timedelta(
+            seconds=app.config['JOB_STALE_AFTER'])
+        return [job_id for job_id, in db.session.query(Job.id).filter(
+            Job.status.in_(('queued', 'running')), Job.updated < stale,
+        ).order_by(Job.created)]
+
+
+class JobChunk(db.Model):
+    job_id = db.Column(db.String(32), db.ForeignKey('job.id'),
+                       primary_key=True)
+    position = db.Column(db.Integer, primary_key=True)
+    size = db.Column(db.Integer)
+    items = db.Column(db.Text)
+    results = db.Column(db.Text, nullable=True)
+
+    def __repr__(self):
+        return f'<JobChunk {self.job_id} {self.position}>'
@@ -0,0 +1,113 @@
+import gzip
+from io import BytesIO
+from flask import json, request, Response
+from werkzeug.exceptions import RequestEntityTooLarge
+from app import app
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+MSGPACK_TYPES = (MSGPACK, 'application/x-msgpack', 'application/vnd.msgpack')
+
+
+def default(value):
+    return app.json_encoder().default(value)
+
+
+def dumps(value):
+    if orjson is None:
+        return json.dumps(value).encode()
+    return orjson.dumps(value, default=default, option=(
+        orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME |
+        orjson.OPT_NON_STR_KEYS
+    ))
+
+
+def loads(body):
+    return json.loads(body) if orjson is None else orjson.loads(body)
+
+
+def compress(body, encoding):
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(
+            level=app.config['API_ZSTD_LEVEL']).compress(body)
+    return gzip.compress(body, app.config['API_GZIP_LEVEL'])
+
+
+def check_size(size):
+    limit = app.config['API_MAX_BODY_SIZE']
+    if size > limit:
+        raise RequestEntityTooLarge(f'Request body exceeds {limit} bytes')
+
+
+def decompress(body, encoding):
+    if encoding == 'gzip':
+        reader = gzip.GzipFile(fileobj=BytesIO(body))
+    elif encoding == 'zstd' and zstandard is not None:
+        reader = zstandard.ZstdDecompressor().stream_reader(BytesIO(body))
+    else:
+        raise ValueError(f'Unsupported Content-Encoding {encoding}')
+    body = reader.read(app.config['API_MAX_BODY_SIZE'] + 1)
+    check_size(len(body))
+    return body
+
+
+def read_body():
+    check_size(request.content_length or 0)
+    body = request.stream.read(app.config['API_MAX_BODY_SIZE'] + 1)
+    check_size(len(body))
+    return body
+
+
+def load_body():
+    body = read_body()
+    encoding = request.headers.get('Content-Encoding', 'identity')
+    if body and encoding != 'identity':
+        body = decompress(body, encoding)
+    if request.mimetype in MSGPACK_TYPES:
+        if msgpack is None:
+            raise ValueError('MessagePack is not supported')
+        return msgpack.unpackb(body, raw=False) if body else None
+    return loads(body) if body and request.is_json else None
+
+
+def negotiate():
+    mimetype = JSON
+    if msgpack is not None and request.accept_mimetypes.best_match(
+            (JSON, MSGPACK)) == MSGPACK:
+        mimetype = MSGPACK
+    encodings = ('zstd', 'gzip') if zstandard is not None else ('gzip',)
+    return mimetype, request.accept_encodings.best_match(encodings)
+
+
+def representation(mimetype, encoding):
+    if mimetype == JSON and encoding is None:
+        return ''
+    return f'-{mimetype.rpartition("/")[2]}-{encoding or "identity"}'
+
+
+def make_api_response(value, mimetype=JSON, encoding=None, status=200):
+    if mimetype == MSGPACK:
+        body = msgpack.packb(value, default=default, use_bin_type=True)
+    else:
+        body = dumps(value) + b'\n'
+    response = Response(body, status, mimetype=mimetype)
+    response.vary.update(('Accept', 'Accept-Encoding'))
+    if encoding and len(body) >= app.config['API_COMPRESS_MIN_SIZE']:
+        response.set_data(compress(body, encoding))
+        response.content_encoding = encoding
+    return response
@@ -0,0 +1,65 @@
+import os
+import pstats
+from cProfile import Profile
+from itertools import count
+from time import time
+from flask import g, request
+from flask_login import current_user
+from app import app
+from app.models import User
+
+requests_counter = count(1)
+
+
+def is_admin():
+    if current_user.is_authenticated and current_user.type == 1:
+        return True
+    auth = request.headers.get('Authorization', '')
+    if auth.startswith('Bearer '):
+        user = User.verify_token(auth[len('Bearer '):])
+        return user is not None and user.type == 1
+    return False
+
+
+def is_requested():
+    return bool(request.headers.get('X-Profile') or
+                request.args.get('profile'))
+
+
+def is_sampled():
+    rate = app.config['PROFILE_SAMPLE_RATE']
+    return rate > 0 and next(requests_counter) % rate == 0
+
+
+def summary(stats, top):
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3],
+                  reverse=True)
+    return '; '.join(
+        f'{func} ({os.path.basename(file)}:{line}) {cumtime:.4f}s'
+        for (file, line, func), (_, _, _, cumtime, _) in rows[:top]
+    )
+
+
+@app.before_request
+def start_profile():
+    g.profile_summary = is_requested() and is_admin()
+    if is_sampled() or g.profile_summary:
+        g.profile = Profile()
+        g.profile.enable()
+
+
+@app.after_request
+def stop_profile(response):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return response
+    profile.disable()
+    os.makedirs(app.config['PROFILE_DIR'], exist_ok=True)
+    profile.dump_stats(os.path.join(
+        app.config['PROFILE_DIR'],
+        f'{request.endpoint}__{int(time() * 1000)}_{os.getpid()}.prof'
+    ))
+    if g.profile_summary:
+        response.headers['X-Profile-Summary'] = summary(
+            pstats.Stats(profile), app.config['PROFILE_TOP'])
+    return response
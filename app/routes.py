@@ -1,14 +1,34 @@
 from functools import wraps
-from flask import render_template, flash, redirect, url_for, request
+from time import time
+from flask import (
+    render_template, flash, redirect, url_for, request, make_response, g,
+    jsonify, abort
+)
 from flask_login import login_user, logout_user, current_user, login_required
 from app import app
-from app.models import User, Task
+from app.models import User, Task, users_tasks, PERFORMER_KEYS
+from app.analytics import board_analytics
+from app.conditional import make_etag, is_fresh, with_etag, not_modified
+from app.events import user_channels, event_stream
+from app.search import search_tasks
 from app.forms import (
     LoginForm, RegistrationForm, AddTask,
     EditTaskForPerformer, EditTaskForOwner, ProfileForm
 )
 
 
+READ_ONLY_ENDPOINTS = {
+    'get_users', 'get_tasks', 'list_tasks', 'search_tasks_', 'time_report',
+    'analytics',
+}
+
+
+@app.before_request
+def route_reads():
+    g.read_only = (request.method == 'GET' or
+                   request.endpoint in READ_ONLY_ENDPOINTS)
+
+
 def admin_required(func):
     @wraps(func)
     def func_new(*args, **kwargs):
@@ -24,7 +44,9 @@ def admin_required(func):
 @login_required
 def index():
     stat = current_user.tasks_quantity()
-    return render_template('index.html', title='Main', stat=stat)
+    analytics = board_analytics() if current_user.type == 1 else None
+    return render_template('index.html', title='Main', stat=stat,
+                           analytics=analytics)
 
 
 @app.route('/register', methods=('GET', 'POST'))
@@ -72,14 +94,33 @@ def logout():
     return redirect(url_for('login'))
 
 
+def get_page_cursor():
+    try:
+        return Task.parse_cursor(request.args.get('after', ''))
+    except ValueError:
+        return None
+
+
+def board(query, tasks_len, title, keys=None):
+    rows, next_page = Task.page_rows(query, get_page_cursor(), keys=keys)
+    etag = make_etag(current_user.get_identity(), tasks_len,
+                     [[row.id, row.version] for row in rows],
+                     int(time() // 60))
+    if is_fresh(etag):
+        return not_modified(etag)
+    return with_etag(make_response(render_template(
+        'tasks.html', title=title, current_user=current_user,
+        tasks=Task.load_page(rows), tasks_len=tasks_len, next_page=next_page
+    )), etag)
+
+
 @app.route('/tasks')
 @login_required
 def tasks():
-    temp = current_user.tasks
-    tasks_len = temp.count() if temp else 0
-    return render_template(
-        'tasks.html', title='Tasks', current_user=current_user,
-        tasks=temp, tasks_len=tasks_len
+    return board(
+        Task.query.join(users_tasks).filter(
+            users_tasks.c.user_id == current_user.id),
+        current_user.tasks_quantity()['to']['all'], 'Tasks', PERFORMER_KEYS
     )
 
 
@@ -87,13 +128,44 @@ def tasks():
 @login_required
 @admin_required
 def assigned_tasks():
+    return board(
+        Task.query.filter_by(author_id=current_user.id),
+        current_user.tasks_quantity()['by']['all'], 'Assigned tasks'
+    )
+
+
+@app.route('/search')
+@login_required
+def search():
+    query = request.args.get('q', '')
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = app.config['SEARCH_PER_PAGE']
+    found, total = search_tasks(query, page, per_page)
     return render_template(
-        'tasks.html', title='Assigned tasks', current_user=current_user,
-        tasks=current_user.assign_tasks.all(),
-        tasks_len=len(current_user.assign_tasks.all())
+        'search.html', title='Search', current_user=current_user,
+        query=query, found=found, total=total, page=page,
+        pages=(total + per_page - 1) // per_page
     )
 
 
+@app.route('/users/autocomplete')
+@login_required
+def users_autocomplete():
+    return jsonify([
+        {'id': user_id, 'login': user_login}
+        for user_id, user_login in User.autocomplete(request.args.get('q', ''))
+    ])
+
+
+@app.route('/events')
+@login_required
+def events():
+    if not app.config['EVENTS_ENABLED']:
+        abort(404)
+    return event_stream(
+        user_channels(current_user, bool(request.args.get('board'))))
+
+
 @app.route('/profile/<int:user_id>', methods=('GET', 'POST'))
 @login_required
 def profile(user_id):
@@ -129,9 +201,9 @@ def profile(user_id):
 
 def task_for_owner(task_):
     form = EditTaskForOwner(request.form)
-    form.users_id.choices = [
-        (user.id, user.login) for user in User.query.all()
-    ]
+    if request.method == 'GET':
+        form.users_id.data = [user.id for user in task_.users]
+    form.users_id.choices = User.performer_choices(form.users_id.data)
     if form.validate_on_submit():
         task_.edit(task_, {
             'delete': form.delete.data,
@@ -146,7 +218,6 @@ def task_for_owner(task_):
         form.title.data = task_.title
         form.description.data = task_.description
         form.status.data = task_.status
-        form.users_id.data = [user.id for user in task_.users]
     else:
         flash('Task does not correct', 'error')
     return render_template(
@@ -183,9 +254,7 @@ def task(task_id):
 @admin_required
 def add_task():
     form = AddTask()
-    form.users_id.choices = [
-        (user.id, user.login) for user in User.query.all()
-    ]
+    form.users_id.choices = User.performer_choices(form.users_id.data)
     task_ = {'author_id': current_user.id}
     if form.validate_on_submit():
         task_ = Task.create({
@@ -0,0 +1,97 @@
+from markupsafe import escape
+from sqlalchemy import event
+from app import db
+from app.models import Task
+
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE task_fts USING fts5("
+    "title, description, content='task', content_rowid='id', "
+    "tokenize='porter unicode61')",
+    "CREATE TRIGGER task_fts_ai AFTER INSERT ON task BEGIN "
+    "INSERT INTO task_fts (rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER task_fts_ad AFTER DELETE ON task BEGIN "
+    "INSERT INTO task_fts (task_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER task_fts_au AFTER UPDATE OF title, description ON task "
+    "BEGIN "
+    "INSERT INTO task_fts (task_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO task_fts (rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+)
+POSTGRES_DDL = (
+    "ALTER TABLE task ADD COLUMN search_vector tsvector",
+    "CREATE INDEX ix_task_search_vector ON task USING gin(search_vector)",
+    "CREATE TRIGGER task_search_vector_update "
+    "BEFORE INSERT OR UPDATE OF title, description ON task FOR EACH ROW "
+    "EXECUTE PROCEDURE tsvector_update_trigger("
+    "search_vector, 'pg_catalog.english', title, description)",
+)
+
+SQLITE_SEARCH = (
+    "SELECT rowid, snippet(task_fts, -1, '\x02', '\x03', '...', 16), "
+    "-bm25(task_fts, 4.0, 1.0) AS rank FROM task_fts "
+    "WHERE task_fts MATCH :query ORDER BY rank DESC, rowid "
+    "LIMIT :limit OFFSET :offset"
+)
+SQLITE_COUNT = "SELECT count(*) FROM task_fts WHERE task_fts MATCH :query"
+POSTGRES_SEARCH = (
+    "SELECT id, ts_headline('english', coalesce(description, ''), query, "
+    "'StartSel=\x02, StopSel=\x03, MaxWords=32, MinWords=8'), "
+    "ts_rank(search_vector, query) AS rank "
+    "FROM task, plainto_tsquery('english', :query) query "
+    "WHERE search_vector @@ query ORDER BY rank DESC, id "
+    "LIMIT :limit OFFSET :offset"
+)
+POSTGRES_COUNT = (
+    "SELECT count(*) FROM task "
+    "WHERE search_vector @@ plainto_tsquery('english', :query)"
+)
+
+
+def create_index(target, connection, **kwargs):
+    if connection.dialect.name == 'sqlite':
+        ddl = SQLITE_DDL
+    elif connection.dialect.name == 'postgresql':
+        ddl = POSTGRES_DDL
+    else:
+        return
+    for statement in ddl:
+        connection.execute(statement)
+
+
+event.listen(Task.__table__, 'after_create', create_index)
+
+
+def highlight(text):
+    return str(escape(text)).replace('\x02', '<mark>').replace(
+        '\x03', '</mark>')
+
+
+def search_tasks(text, page, per_page):
+    if db.engine.name == 'sqlite':
+        query = ' '.join(
+            '"{}"'.format(word.replace('"', '""')) for word in text.split()
+        )
+        search, count = SQLITE_SEARCH, SQLITE_COUNT
+    elif db.engine.name == 'postgresql':
+        query = text
+        search, count = POSTGRES_SEARCH, POSTGRES_COUNT
+    else:
+        raise ValueError(f'Search is not supported by {db.engine.name}')
+    if not query:
+        return [], 0
+
+    rows = db.session.execute(search, {
+        'query': query,
+        'limit': per_page,
+        'offset': (page - 1) * per_page,
+    }).fetchall()
+    total = db.session.execute(count, {'query': query}).scalar()
+    tasks = {task.id: task for task in Task.query_eager().filter(
+        Task.id.in_([task_id for task_id, snippet, rank in rows]))}
+    return [
+        (tasks[task_id], highlight(snippet), rank)
+        for task_id, snippet, rank in rows if task_id in tasks
+    ], total
@@ -0,0 +1,211 @@
+"""Benchmark the API and the web pages on a synthetic dataset.
+
+Every path is requested through the Flask test client against a fresh
+SQLite database; the run fails when a path exceeds its budget from
+budgets.json (SQL statements per request and p95 latency in ms). The
+budgets assume the default --batch size.
+
+    python benchmarks/run.py --users 500 --tasks 20000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+from time import perf_counter
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGETS = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       'budgets.json')
+PASSWORD = 'password'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--tasks', type=int, default=5000)
+    parser.add_argument('--performers', type=int, default=3,
+                        help='Performers per task.')
+    parser.add_argument('--batch', type=int, default=50,
+                        help='Items per API batch request.')
+    parser.add_argument('--repeat', type=int, default=20,
+                        help='Requests per path.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--budgets', default=BUDGETS)
+    parser.add_argument('--output', help='Write the results as JSON.')
+    return parser.parse_args()
+
+
+def generate(args, User, Task):
+    from werkzeug.security import generate_password_hash
+    from app.models import chunked
+
+    password_hash = generate_password_hash(PASSWORD)
+    users = [{
+        'login': f'user{i}',
+        'email': f'user{i}@example.com',
+        'first_name': f'First{i}',
+        'last_name': f'Last{i}',
+        'type': int(i % 10 == 0),
+        'password_hash': password_hash,
+    } for i in range(args.users)]
+    for chunk in chunked(users, 1000):
+        User.bulk_create(chunk, restore=True)
+
+    admins = [user['login'] for user in users if user['type'] == 1]
+    logins = [user['login'] for user in users]
+    words = ('login', 'crash', 'report', 'deploy', 'release', 'invoice',
+             'search', 'board', 'email', 'timeout', 'cache', 'export')
+    tasks = ({
+        'title': f'task{i}',
+        'description': ' '.join(random.choices(words, k=12)),
+        'author': random.choice(admins),
+        'users': random.sample(logins, args.performers),
+        'status': random.randrange(4),
+    } for i in range(args.tasks))
+    for chunk in chunked(tasks, 1000):
+        Task.bulk_create(chunk, restore=True)
+    return admins, logins
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def main():
+    args = parse_args()
+    random.seed(args.seed)
+    database = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False)
+    os.environ['DATABASE_URL'] = f'sqlite:///{database.name}'
+    sys.path.insert(0, BASE_DIR)
+
+    from sqlalchemy import event
+    from app import app, db
+    from app.models import User, Task
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    db.create_all()
+    started = perf_counter()
+    admins, logins = generate(args, User, Task)
+    print(f'Generated {args.users} users and {args.tasks} tasks '
+          f'in {perf_counter() - started:.1f}s')
+    db.session.remove()
+
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute',
+                 lambda *args_: statements.append(1))
+
+    client = app.test_client()
+    admin = admins[0]
+    client.post('/login', data={'login': admin, 'password': PASSWORD})
+    token = client.post('/api/token', json={
+        'login': admin, 'password': PASSWORD}).get_json()['data']['token']
+    headers = {'Authorization': f'Bearer {token}'}
+    with app.app_context():
+        task_id = Task.query.filter_by(
+            author_id=User.query.filter_by(login=admin).first().id
+        ).first().id
+
+    def titles():
+        return [{'title': f'task{random.randrange(args.tasks)}'}
+                for _ in range(args.batch)]
+
+    def users():
+        return [{'login': random.choice(logins)} for _ in range(args.batch)]
+
+    counter = iter(range(10 ** 9))
+
+    def new_tasks():
+        return [{
+            'title': f'bench{next(counter)}',
+            'description': 'benchmark task',
+            'author': admin,
+            'users': random.sample(logins, args.performers),
+        } for _ in range(args.batch)]
+
+    def new_users():
+        return [{
+            'login': f'bench{n}',
+            'email': f'bench{n}@example.com',
+            'first_name': 'Bench',
+            'last_name': 'Bench',
+            'type': 0,
+            'password': PASSWORD,
+        } for n in (next(counter) for _ in range(args.batch))]
+
+    paths = {
+        'GET /index': lambda: client.get('/index'),
+        'GET /tasks': lambda: client.get('/tasks'),
+        'GET /assigned_tasks': lambda: client.get('/assigned_tasks'),
+        'GET /add_task': lambda: client.get('/add_task'),
+        'GET /task': lambda: client.get(f'/task/{task_id}'),
+        'GET /search': lambda: client.get('/search?q=login+crash'),
+        'POST /api/get_tasks': lambda: client.post(
+            '/api/get_tasks', json=titles()),
+        'POST /api/list_tasks': lambda: client.post(
+            '/api/list_tasks', json={'status': [0, 1], 'limit': args.batch}),
+        'POST /api/search_tasks': lambda: client.post(
+            '/api/search_tasks', json={'query': 'deploy timeout'}),
+        'POST /api/get_users': lambda: client.post(
+            '/api/get_users', json=users(), headers=headers),
+        'POST /api/edit_users': lambda: client.post(
+            '/api/edit_users', json=[dict(user, first_name='Edited')
+                                     for user in users()], headers=headers),
+        'POST /api/add_tasks': lambda: client.post(
+            '/api/add_tasks', json=new_tasks()),
+        'POST /api/edit_tasks': lambda: client.post(
+            '/api/edit_tasks', json=[dict(task, status=random.randrange(4))
+                                     for task in titles()]),
+        'POST /api/reassign_tasks': lambda: client.post(
+            '/api/reassign_tasks', json=[
+                dict(task, users=random.sample(logins, args.performers))
+                for task in titles()
+            ]),
+        'POST /api/add_users': lambda: client.post(
+            '/api/add_users', json=new_users()),
+    }
+
+    with open(args.budgets) as file:
+        budgets = json.load(file)
+    results, failed = {}, []
+    print(f'{"path":28} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} '
+          f'{"max sql":>8}')
+    for name, request in paths.items():
+        latencies, counts = [], []
+        for _ in range(args.repeat):
+            del statements[:]
+            started = perf_counter()
+            response = request()
+            latencies.append((perf_counter() - started) * 1000)
+            counts.append(len(statements))
+            if response.status_code >= 400:
+                failed.append(f'{name}: status {response.status_code}')
+                break
+        results[name] = {
+            'p50_ms': percentile(latencies, 0.5),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+            'statements': max(counts),
+        }
+        result = results[name]
+        print(f'{name:28} {result["p50_ms"]:8.1f} {result["p95_ms"]:8.1f} '
+              f'{result["p99_ms"]:8.1f} {result["statements"]:8}')
+        budget = budgets.get(name, {})
+        for key in ('statements', 'p95_ms'):
+            if key in budget and result[key] > budget[key]:
+                failed.append(f'{name}: {key} {result[key]:.1f} '
+                              f'over budget {budget[key]}')
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=4)
+    os.unlink(database.name)
+    if failed:
+        print('\n'.join(['Over budget:'] + failed))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,3 +9,56 @@ class Config:
             'sqlite:///' + os.path.join(basedir, 'db.sqlite3')
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    READ_REPLICA_URL = os.environ.get('READ_REPLICA_URL')
+    SQLALCHEMY_BINDS = (
+            {'replica': READ_REPLICA_URL} if READ_REPLICA_URL else None
+    )
+    DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE') or 0)
+    DATABASE_MAX_OVERFLOW = int(os.environ.get('DATABASE_MAX_OVERFLOW') or 10)
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE') or 'wal',
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS') or 'normal',
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE') or 268435456),
+        'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE') or -65536),
+    }
+    API_TOKEN_EXPIRES_IN = int(os.environ.get('API_TOKEN_EXPIRES_IN') or 3600)
+    BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE') or 500)
+    SQL_IN_CHUNK_SIZE = int(os.environ.get('SQL_IN_CHUNK_SIZE') or 500)
+    PURGE_PAUSE = float(os.environ.get('PURGE_PAUSE') or 0.1)
+    TASKS_PER_PAGE = int(os.environ.get('TASKS_PER_PAGE') or 50)
+    SEARCH_PER_PAGE = int(os.environ.get('SEARCH_PER_PAGE') or 20)
+    API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE') or 1000)
+    API_MAX_BODY_SIZE = int(os.environ.get('API_MAX_BODY_SIZE') or 33554432)
+    API_COMPRESS_MIN_SIZE = int(
+        os.environ.get('API_COMPRESS_MIN_SIZE') or 1024)
+    API_GZIP_LEVEL = int(os.environ.get('API_GZIP_LEVEL') or 6)
+    API_ZSTD_LEVEL = int(os.environ.get('API_ZSTD_LEVEL') or 3)
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 0)
+    SLOW_QUERY_THRESHOLD = float(os.environ.get('SLOW_QUERY_THRESHOLD') or 0.1)
+    CACHE_URL = os.environ.get('CACHE_URL')
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE') or 1024)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 300)
+    PERFORMERS_CACHE_SIZE = 1
+    PERFORMERS_CACHE_TTL = int(os.environ.get('PERFORMERS_CACHE_TTL') or 300)
+    PERFORMER_CHOICES_LIMIT = int(
+        os.environ.get('PERFORMER_CHOICES_LIMIT') or 200)
+    AUTOCOMPLETE_LIMIT = int(os.environ.get('AUTOCOMPLETE_LIMIT') or 20)
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS') or 2)
+    JOB_STALE_AFTER = int(os.environ.get('JOB_STALE_AFTER') or 600)
+    JOB_RETENTION = int(os.environ.get('JOB_RETENTION') or 86400)
+    EVENTS_ENABLED = bool(os.environ.get('EVENTS_ENABLED'))
+    EVENTS_URL = os.environ.get('EVENTS_URL')
+    EVENTS_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE') or 100)
+    EVENTS_POLL_INTERVAL = float(os.environ.get('EVENTS_POLL_INTERVAL') or 0.5)
+    EVENTS_RETENTION = int(os.environ.get('EVENTS_RETENTION') or 60)
+    EVENTS_KEEPALIVE = int(os.environ.get('EVENTS_KEEPALIVE') or 15)
+    EVENTS_STREAM_TIMEOUT = int(os.environ.get('EVENTS_STREAM_TIMEOUT') or 300)
+    EVENTS_RETRY = int(os.environ.get('EVENTS_RETRY') or 3000)
+    PROFILE_DIR = (
+            os.environ.get('PROFILE_DIR') or os.path.join(basedir, 'profiles')
+    )
+    ANALYTICS_WEEKS = int(os.environ.get('ANALYTICS_WEEKS') or 12)
+    ANALYTICS_CACHE_SIZE = int(os.environ.get('ANALYTICS_CACHE_SIZE') or 16)
+    ANALYTICS_CACHE_TTL = int(os.environ.get('ANALYTICS_CACHE_TTL') or 300)
+    PROFILE_TOP = int(os.environ.get('PROFILE_TOP') or 10)
+    PROFILE_SAMPLE_RATE = int(os.environ.get('PROFILE_SAMPLE_RATE') or 0)
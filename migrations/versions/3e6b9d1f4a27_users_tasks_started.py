@@ -0,0 +1,30 @@
+"""users_tasks started
+
+Revision ID: 3e6b9d1f4a27
+Revises: b5e1f8d3c624
+Create Date: 2026-10-18 21:14:52.904613
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e6b9d1f4a27'
+down_revision = 'b5e1f8d3c624'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users_tasks', sa.Column('started', sa.DateTime(), nullable=True))
+    op.execute(
+        'UPDATE users_tasks SET started = '
+        '(SELECT task.started FROM task WHERE task.id = users_tasks.task_id)'
+    )
+    op.create_index('ix_users_tasks_user_id_started', 'users_tasks', ['user_id', 'started', 'task_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_users_tasks_user_id_started', table_name='users_tasks')
+    op.drop_column('users_tasks', 'started')
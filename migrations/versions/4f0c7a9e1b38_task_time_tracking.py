@@ -0,0 +1,69 @@
+"""task time tracking
+
+Revision ID: 4f0c7a9e1b38
+Revises: e81b4f6a2d90
+Create Date: 2026-10-18 16:05:27.804512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f0c7a9e1b38'
+down_revision = 'e81b4f6a2d90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('task_event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('task_id', sa.Integer(), nullable=True),
+    sa.Column('previous', sa.Integer(), nullable=True),
+    sa.Column('status', sa.Integer(), nullable=True),
+    sa.Column('created', sa.DateTime(), nullable=True),
+    sa.Column('active', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['task_id'], ['task.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_task_event_created', 'task_event', ['created', 'task_id', 'active'], unique=False)
+    op.create_index(op.f('ix_task_event_task_id'), 'task_event', ['task_id'], unique=False)
+    op.add_column('task', sa.Column('active_time', sa.Float(), nullable=True))
+    op.add_column('task', sa.Column('resumed', sa.DateTime(), nullable=True))
+
+    task = sa.table(
+        'task', sa.column('id', sa.Integer), sa.column('status', sa.Integer),
+        sa.column('started', sa.DateTime), sa.column('finished', sa.DateTime),
+        sa.column('active_time', sa.Float), sa.column('resumed', sa.DateTime),
+    )
+    task_event = sa.table(
+        'task_event', sa.column('task_id', sa.Integer),
+        sa.column('status', sa.Integer), sa.column('created', sa.DateTime),
+        sa.column('active', sa.Float),
+    )
+    connection = op.get_bind()
+    tasks, events = [], []
+    for id_, status, started, finished in connection.execute(
+            sa.select([task.c.id, task.c.status, task.c.started,
+                       task.c.finished])):
+        active, resumed, created = 0, started, started
+        if status == 3:
+            resumed = None
+            if finished is not None:
+                active, created = (finished - started).total_seconds(), finished
+        tasks.append({'id_': id_, 'active_time': active, 'resumed': resumed})
+        events.append({'task_id': id_, 'status': status, 'created': created,
+                       'active': active})
+    if tasks:
+        connection.execute(task.update().where(
+            task.c.id == sa.bindparam('id_')), tasks)
+        connection.execute(task_event.insert(), events)
+
+
+def downgrade():
+    op.drop_column('task', 'resumed')
+    op.drop_column('task', 'active_time')
+    op.drop_index(op.f('ix_task_event_task_id'), table_name='task_event')
+    op.drop_index('ix_task_event_created', table_name='task_event')
+    op.drop_table('task_event')
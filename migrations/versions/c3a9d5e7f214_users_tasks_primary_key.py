@@ -0,0 +1,52 @@
+"""users_tasks primary key
+
+Revision ID: c3a9d5e7f214
+Revises: 9b7f3e2c1a56
+Create Date: 2026-10-18 12:40:05.161803
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3a9d5e7f214'
+down_revision = '9b7f3e2c1a56'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        'CREATE TABLE users_tasks_distinct AS '
+        'SELECT DISTINCT user_id, task_id FROM users_tasks '
+        'WHERE user_id IS NOT NULL AND task_id IS NOT NULL'
+    )
+    op.execute('DELETE FROM users_tasks')
+    op.execute(
+        'INSERT INTO users_tasks (user_id, task_id) '
+        'SELECT user_id, task_id FROM users_tasks_distinct'
+    )
+    op.drop_table('users_tasks_distinct')
+
+    op.drop_index('ix_users_tasks_user_id_task_id', table_name='users_tasks')
+    with op.batch_alter_table('users_tasks', recreate='always') as batch_op:
+        batch_op.alter_column('user_id', existing_type=sa.Integer(),
+                              nullable=False)
+        batch_op.alter_column('task_id', existing_type=sa.Integer(),
+                              nullable=False)
+        batch_op.create_primary_key('pk_users_tasks', ['user_id', 'task_id'])
+    op.create_index('ix_users_tasks_task_id_user_id', 'users_tasks', ['task_id', 'user_id'], unique=False)
+    op.create_index('ix_task_author_id_status', 'task', ['author_id', 'status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_task_author_id_status', table_name='task')
+    op.drop_index('ix_users_tasks_task_id_user_id', table_name='users_tasks')
+    with op.batch_alter_table('users_tasks', recreate='always') as batch_op:
+        batch_op.drop_constraint('pk_users_tasks', type_='primary')
+        batch_op.alter_column('user_id', existing_type=sa.Integer(),
+                              nullable=True)
+        batch_op.alter_column('task_id', existing_type=sa.Integer(),
+                              nullable=True)
+    op.create_index('ix_users_tasks_user_id_task_id', 'users_tasks', ['user_id', 'task_id'], unique=False)
@@ -0,0 +1,74 @@
+"""task search index
+
+Revision ID: e81b4f6a2d90
+Revises: c3a9d5e7f214
+Create Date: 2026-10-18 14:21:53.358979
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e81b4f6a2d90'
+down_revision = 'c3a9d5e7f214'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE task_fts USING fts5("
+            "title, description, content='task', content_rowid='id', "
+            "tokenize='porter unicode61')"
+        )
+        op.execute(
+            "CREATE TRIGGER task_fts_ai AFTER INSERT ON task BEGIN "
+            "INSERT INTO task_fts (rowid, title, description) "
+            "VALUES (new.id, new.title, new.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER task_fts_ad AFTER DELETE ON task BEGIN "
+            "INSERT INTO task_fts (task_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER task_fts_au AFTER UPDATE OF title, description "
+            "ON task BEGIN "
+            "INSERT INTO task_fts (task_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); "
+            "INSERT INTO task_fts (rowid, title, description) "
+            "VALUES (new.id, new.title, new.description); END"
+        )
+        op.execute("INSERT INTO task_fts (task_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        op.execute("ALTER TABLE task ADD COLUMN search_vector tsvector")
+        op.execute(
+            "UPDATE task SET search_vector = to_tsvector("
+            "'pg_catalog.english', "
+            "coalesce(title, '') || ' ' || coalesce(description, ''))"
+        )
+        op.execute(
+            "CREATE INDEX ix_task_search_vector ON task "
+            "USING gin(search_vector)"
+        )
+        op.execute(
+            "CREATE TRIGGER task_search_vector_update "
+            "BEFORE INSERT OR UPDATE OF title, description ON task "
+            "FOR EACH ROW EXECUTE PROCEDURE tsvector_update_trigger("
+            "search_vector, 'pg_catalog.english', title, description)"
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER task_fts_au")
+        op.execute("DROP TRIGGER task_fts_ad")
+        op.execute("DROP TRIGGER task_fts_ai")
+        op.execute("DROP TABLE task_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP TRIGGER task_search_vector_update ON task")
+        op.execute("DROP INDEX ix_task_search_vector")
+        op.execute("ALTER TABLE task DROP COLUMN search_vector")
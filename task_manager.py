@@ -1,7 +1,11 @@
 from app import app, db
-from app.models import User, Task, users_tasks
+from app.models import (
+    User, Task, TaskCounter, TaskEvent, Job, JobChunk, users_tasks
+)
 
 
 @app.shell_context_processor
 def make_shell_context():
-    return {'db': db, 'users_tasks': users_tasks, 'User': User, 'Task': Task, }
+    return {'db': db, 'users_tasks': users_tasks, 'User': User, 'Task': Task,
+            'TaskCounter': TaskCounter, 'TaskEvent': TaskEvent, 'Job': Job,
+            'JobChunk': JobChunk, }